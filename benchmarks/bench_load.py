@@ -0,0 +1,285 @@
+"""
+점심 시간대 동시 접속 부하 테스트: 여러 키오스크 세션이 동시에 질문하는 상황을 외부 서비스 없이 재현합니다.
+화면과 분리된 AnswerPipeline(MainChatbot.process_user_query가 사용하는 것과 같은 경로)을 그대로 실행하고,
+LLM은 토큰 속도를 조절할 수 있는 가짜 스트리밍 모델, Google Sheets는 GoogleAPIManager에 주입한 가짜 서비스,
+채팅 기록은 SQLite(:memory:) 저장소를 사용합니다.
+
+    python -m benchmarks.bench_load --sessions 30 --turns 5 --output results.json
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+# 설정 로드에 필요한 API 키는 가짜 값으로 채웁니다 (외부 호출 없음).
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+
+from langchain.memory import ConversationTokenBufferMemory
+from langchain_core.messages import AIMessageChunk
+from config.settings import settings
+from streaming import StreamHandler
+from utils import llm
+from utils.admission import AdmissionController
+from utils.answer_cache import AnswerCache
+from utils.answer_pipeline import AnswerPipeline
+from utils.chat_backends import SQLiteChatBackend
+from utils.chat_session_manager import ChatSessionManager
+from utils.context_gatherer import ContextGatherer
+from utils.googlesheetapi import GoogleAPIManager
+from utils.llm_router import LLMRouter
+from utils.memory_store import SessionMemoryStore
+from utils.metrics import metrics
+from utils.prompt_builder import PromptBuilder
+from utils.prompt_store import PromptStore
+from utils.retrieval import StoreIndex, StoreRetriever
+from utils.store_registry import get_store_registry
+from utils.waiting_queue import WaitingQueueCache, make_sheet_fetcher
+
+STORE_NAME = "서울창업허브 3층 그집밥"
+SPREADSHEET_ID = "bench-spreadsheet"
+# 점심 시간대 질문 구성 (즉답, 대기 현황, 자유 질문)
+QUERY_MIX = [
+    "식권 1장 주문할게요",
+    "식권 3장 주문할게요",
+    "오늘급식메뉴는 뭔가요?",
+    "배식줄 얼마나 길어요?",
+    "지금 가면 오래 기다려야 하나요?",
+    "채식 메뉴도 있나요?",
+    "결제는 어떻게 하나요?",
+    "단체로 10명 가도 되나요?",
+]
+STAGES = ("context", "prompt", "lookup", "generate", "persist", "total")
+
+
+class FakeRequest:
+    def __init__(self, result, latency: float):
+        self.result = result
+        self.latency = latency
+
+    def execute(self):
+        time.sleep(self.latency)
+        return self.result
+
+
+class FakeSheetsService:
+    """spreadsheets().get / values().get 만 흉내 내는 가짜 Google Sheets 서비스입니다."""
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, fields=None, range=None):
+        with self._lock:
+            self.calls += 1
+        if range is None:
+            return FakeRequest({"sheets": [{"properties": {"title": "대기현황"}}]}, self.latency)
+        rows = [["1번 배식줄", str(random.randint(0, 30))], ["2번 배식줄", str(random.randint(0, 30))]]
+        return FakeRequest({"values": rows}, self.latency)
+
+
+class FakeStreamingLLM:
+    """첫 토큰 지연과 초당 토큰 수를 조절할 수 있는 가짜 스트리밍 LLM입니다."""
+
+    def __init__(self, ttft: float = 0.4, tokens_per_sec: float = 60.0, answer_tokens: int = 80):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.answer_tokens = answer_tokens
+
+    def stream(self, messages):
+        input_tokens = sum(len(str(m.content)) for m in messages) // 2
+        time.sleep(self.ttft)
+        for i in range(self.answer_tokens):
+            yield AIMessageChunk(content=f"토큰{i} ")
+            time.sleep(1.0 / self.tokens_per_sec)
+        yield AIMessageChunk(content="", usage_metadata={
+            "input_tokens": input_tokens, "output_tokens": self.answer_tokens,
+            "total_tokens": input_tokens + self.answer_tokens
+        })
+
+
+class NullContainer:
+    def markdown(self, text):
+        pass
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 1)}
+
+
+def build_pipeline(args):
+    chat_session_manager = ChatSessionManager(backend=SQLiteChatBackend(":memory:"))
+    chat_session_manager.enable_write_behind(
+        batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+        flush_interval=settings.CHAT_WRITE_FLUSH_INTERVAL,
+        journal_path=None,
+        dead_letter_path=None
+    )
+    sheets = FakeSheetsService(latency=args.sheets_latency)
+    waiting_cache = WaitingQueueCache(
+        make_sheet_fetcher(GoogleAPIManager(sheet_service=sheets), SPREADSHEET_ID),
+        refresh_interval=settings.WAITING_REFRESH_INTERVAL
+    )
+    waiting_cache.start()
+    prompt_builder = PromptBuilder(model=settings.DEFAULT_MODEL, budget_tokens=settings.PROMPT_TOKEN_BUDGET)
+    memory_store = SessionMemoryStore(
+        lambda: ConversationTokenBufferMemory(
+            llm=llm.get_token_counter_llm(),
+            max_token_limit=settings.SESSION_MEMORY_MAX_TOKENS
+        ),
+        max_sessions=settings.SESSION_MEMORY_MAX_SESSIONS,
+        idle_timeout=settings.SESSION_MEMORY_IDLE_TIMEOUT
+    )
+    pipeline = AnswerPipeline(
+        store_name=STORE_NAME,
+        store_registry=get_store_registry(),
+        chat_session_manager=chat_session_manager,
+        memory_store=memory_store,
+        prompt_builder=prompt_builder,
+        retriever=StoreRetriever(
+            get_store_registry(), StoreIndex(), count_tokens=prompt_builder.count,
+            top_k=settings.RETRIEVAL_TOP_K, min_doc_tokens=settings.RETRIEVAL_MIN_DOC_TOKENS
+        ),
+        context_gatherer=ContextGatherer(
+            max_workers=settings.CONTEXT_MAX_WORKERS,
+            max_inflight_per_source=settings.CONTEXT_MAX_INFLIGHT_PER_SOURCE
+        ),
+        waiting_cache=waiting_cache,
+        answer_cache=AnswerCache(
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl=settings.ANSWER_CACHE_TTL if args.answer_cache else 0.0
+        ),
+        prompt_store=PromptStore(chat_session_manager),
+        documents_deadline=settings.CONTEXT_DEADLINE_DOCUMENTS,
+        waiting_deadline=settings.CONTEXT_DEADLINE_WAITING,
+        retrieval_deadline=settings.CONTEXT_DEADLINE_RETRIEVAL,
+        admission=AdmissionController(
+            {"fake": args.llm_concurrency}, queue_timeout=args.queue_timeout
+        ) if args.llm_concurrency else None
+    )
+    router = LLMRouter(
+        {"fake": FakeStreamingLLM(args.llm_ttft, args.tokens_per_sec, args.answer_tokens)},
+        default_backend="fake", hedge=False
+    )
+    return pipeline, router, sheets
+
+
+def run_session(index, pipeline, router, args, time_info, records, lock, start_barrier):
+    session_id = pipeline.chat_session_manager.create_session(STORE_NAME)
+    # 실행마다 같은 질문 순서가 나오도록 seed와 세션 번호로 난수를 고정합니다.
+    rng = random.Random(f"{args.seed}:{index}")
+    start_barrier.wait()
+    for _ in range(args.turns):
+        query = rng.choice(QUERY_MIX)
+        handler = StreamHandler(NullContainer(), max_fps=settings.STREAM_MAX_FPS,
+                                min_chars=settings.STREAM_MIN_CHARS)
+        started = time.perf_counter()
+        try:
+            result = pipeline.answer(session_id, query, router, handler, time_info=time_info)
+            record = {
+                "ok": True,
+                "source": result.source,
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "ttft_ms": ((handler.first_token_at or time.perf_counter()) - started) * 1000,
+                "stages": result.timings_ms,
+                "frames": handler.frames,
+                "context_status": result.context.status,
+            }
+        except Exception as e:
+            record = {"ok": False, "error": str(e), "latency_ms": (time.perf_counter() - started) * 1000}
+        with lock:
+            records.append(record)
+        if args.think_time:
+            time.sleep(rng.uniform(0, args.think_time))
+
+
+def summarize(records, elapsed, pipeline, sheets):
+    ok = [r for r in records if r["ok"]]
+    sources = {}
+    for r in ok:
+        sources[r["source"]] = sources.get(r["source"], 0) + 1
+    degraded = sum(1 for r in ok if any(s != "ok" for s in r["context_status"].values()))
+    return {
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "throughput_rps": round(len(records) / elapsed, 2) if elapsed else None,
+        "latency_ms": percentiles([r["latency_ms"] for r in ok]),
+        "ttft_ms": percentiles([r["ttft_ms"] for r in ok]),
+        # 즉답은 context/prompt 단계를 건너뛰므로 해당 단계가 있는 요청만 집계합니다.
+        "stages_ms": {
+            stage: percentiles([r["stages"][stage] for r in ok if stage in r["stages"]]) for stage in STAGES
+        },
+        "sources": sources,
+        "degraded_context": degraded,
+        "frames_per_answer": percentiles([r["frames"] for r in ok]),
+        "sheets_calls": sheets.calls,
+        "answer_cache": pipeline.answer_cache.stats(),
+        "memory_store": pipeline.memory_store.stats(),
+        "write_behind": pipeline.chat_session_manager.write_queue.stats(),
+        "admission": pipeline.admission.stats() if pipeline.admission else None,
+        # Sheets/채팅 저장소 호출별 구간 시간 (히스토그램 구간 상한 기준 근사값, 초)
+        "spans": metrics.to_dict()["histograms"].get("span_seconds", {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="동시 세션 수")
+    parser.add_argument("--turns", type=int, default=5, help="세션당 질문 수")
+    parser.add_argument("--think-time", type=float, default=0.5, help="질문 사이 최대 대기 시간(초)")
+    parser.add_argument("--llm-ttft", type=float, default=0.4, help="가짜 LLM 첫 토큰 지연(초)")
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0)
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--llm-concurrency", type=int, default=0, help="LLM 동시 호출 제한 (0이면 제한 없음)")
+    parser.add_argument("--queue-timeout", type=float, default=settings.ADMISSION_QUEUE_TIMEOUT,
+                        help="LLM 대기열 마감 시간(초)")
+    parser.add_argument("--sheets-latency", type=float, default=0.2, help="가짜 Sheets 요청 지연(초)")
+    parser.add_argument("--no-answer-cache", dest="answer_cache", action="store_false")
+    parser.add_argument("--weekday", default="화요일")
+    parser.add_argument("--time", default="12:10")
+    parser.add_argument("--seed", type=int, default=0, help="질문 순서와 가짜 Sheets 값의 난수 seed")
+    parser.add_argument("--output", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    pipeline, router, sheets = build_pipeline(args)
+    time_info = {"time": args.time, "date": "2024년 11월 19일", "weekday": args.weekday}
+    records, lock = [], threading.Lock()
+    start_barrier = threading.Barrier(args.sessions + 1)
+    threads = [
+        threading.Thread(target=run_session, args=(i, pipeline, router, args, time_info, records, lock, start_barrier))
+        for i in range(args.sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    pipeline.chat_session_manager.write_queue.flush()
+
+    summary = summarize(records, elapsed, pipeline, sheets)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({"args": vars(args), "results": summary}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
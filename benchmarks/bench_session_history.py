@@ -0,0 +1,107 @@
+"""
+세션 기록 조회 벤치마크: 기존 select('*') 전체 조회와 keyset 페이지 + 컬럼 선택 조회를 비교합니다.
+
+    python -m benchmarks.bench_session_history                 # 로컬 SQLite 합성 데이터
+    python -m benchmarks.bench_session_history --supabase ID..  # 실제 Supabase 세션
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from utils.chat_backends import SQLiteChatBackend
+from utils.chat_session_manager import ChatSessionManager
+
+PROJECTED_COLUMNS = ["question.text", "answer.text"]
+
+
+def payload_bytes(rows) -> int:
+    return len(json.dumps(rows, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def seed(manager: ChatSessionManager, sessions: int, turns: int, prompt_chars: int):
+    filler = "공통 지시사항 및 매장 정보 " * (prompt_chars // 16)
+    start = datetime(2024, 11, 19, 11, 30)
+    session_ids = []
+    for s in range(sessions):
+        session_id = str(uuid.uuid4())
+        created = (start + timedelta(minutes=s)).isoformat()
+        manager.backend.insert_sessions([{
+            'id': session_id, 'store_name': '서울창업허브 3층 그집밥',
+            'created_at': created, 'updated_at': created
+        }])
+        manager.backend.insert_messages([
+            {
+                'session_id': session_id,
+                'role': 'user',
+                'question': {'text': f"식권 {t + 1}장 주문할게요", 'full_query': filler + "\n" * t},
+                'answer': {'text': f"식권 {t + 1}장, 총 결제 금액은 {(t + 1) * 6000:,}원입니다."},
+                'created_at': (start + timedelta(minutes=s, seconds=t)).isoformat(),
+            }
+            for t in range(turns)
+        ])
+        session_ids.append(session_id)
+    return session_ids
+
+
+def measure(label: str, fn):
+    started = time.perf_counter()
+    rows = fn()
+    elapsed = (time.perf_counter() - started) * 1000
+    size = payload_bytes(rows)
+    print(f"{label:<40} rows={len(rows):>6}  bytes={size:>12,}  latency={elapsed:>8.1f}ms")
+    return {"rows": len(rows), "bytes": size, "latency_ms": round(elapsed, 2)}
+
+
+def run(manager: ChatSessionManager, session_ids, page_size: int):
+    results = {}
+    results["full_select_per_session"] = measure(
+        "select('*') per session",
+        lambda: [row for sid in session_ids for row in manager.get_session_messages(sid)]
+    )
+    results["paged_projected_per_session"] = measure(
+        f"keyset pages({page_size}) + projection",
+        lambda: [
+            row for sid in session_ids
+            for page in manager.iter_session_messages(sid, columns=PROJECTED_COLUMNS, page_size=page_size)
+            for row in page
+        ]
+    )
+    results["bulk_projected"] = measure(
+        "bulk multi-session + projection",
+        lambda: [
+            row for rows in manager.get_sessions_messages(session_ids, columns=PROJECTED_COLUMNS).values()
+            for row in rows
+        ]
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--prompt-chars", type=int, default=6000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--supabase", nargs="*", metavar="SESSION_ID", help="Supabase에 있는 세션 ID로 측정")
+    parser.add_argument("--output", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    if args.supabase:
+        load_dotenv()
+        manager = ChatSessionManager(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+        session_ids = args.supabase
+    else:
+        manager = ChatSessionManager(backend=SQLiteChatBackend(":memory:"))
+        session_ids = seed(manager, args.sessions, args.turns, args.prompt_chars)
+
+    results = run(manager, session_ids, args.page_size)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({"args": vars(args), "results": results}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
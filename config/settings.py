@@ -11,6 +11,112 @@ class Settings(BaseSettings):
     DEFAULT_MODEL: str = "gpt-4o-mini"
     MAX_CONVERSATION_HISTORY: int = 10
 
+    # 대기 현황 캐시 갱신 주기 (초)
+    WAITING_REFRESH_INTERVAL: float = 10.0
+
+    # Google Sheets 메타데이터 캐시 유지 시간 (초)
+    GOOGLE_SHEETS_METADATA_TTL: float = 300.0
+
+    # Google API 할당량 (분당 요청 수), 재시도 횟수, 할당량 최대 대기(초), 회로 차단 (연속 실패 수, 차단 시간(초))
+    GOOGLE_SHEETS_READS_PER_MINUTE: float = 60.0
+    GOOGLE_SHEETS_WRITES_PER_MINUTE: float = 60.0
+    GOOGLE_DRIVE_REQUESTS_PER_MINUTE: float = 600.0
+    GOOGLE_API_MAX_RETRIES: int = 4
+    GOOGLE_API_MAX_QUOTA_WAIT: float = 10.0
+    GOOGLE_API_BREAKER_THRESHOLD: int = 5
+    GOOGLE_API_BREAKER_RESET: float = 30.0
+
+    # 세션별 대화 메모리 (토큰 상한, 최대 세션 수, 유휴 세션 만료 시간(초))
+    SESSION_MEMORY_MAX_TOKENS: int = 2000
+    SESSION_MEMORY_MAX_SESSIONS: int = 500
+    SESSION_MEMORY_IDLE_TIMEOUT: float = 1800.0
+
+    # 프롬프트 전체 토큰 예산 (넘으면 오래된 대화부터 제외)
+    PROMPT_TOKEN_BUDGET: int = 6000
+
+    # 반복 질문 답변 캐시
+    ANSWER_CACHE_TTL: float = 300.0
+    ANSWER_CACHE_MAX_ENTRIES: int = 256
+
+    # 매장 문서 검색 (문서가 이 토큰 수보다 길면 질문 관련 청크만 프롬프트에 넣음)
+    RETRIEVAL_MIN_DOC_TOKENS: int = 600
+    RETRIEVAL_TOP_K: int = 4
+    RETRIEVAL_INDEX_PATH: str = ".cache/store_index.json"
+
+    # 채팅 기록 저장소 ("supabase" 또는 로컬 대체용 "sqlite")와 write-behind 설정
+    CHAT_BACKEND: str = "supabase"
+    CHAT_SQLITE_PATH: str = ".cache/chat.db"
+    CHAT_WRITE_BATCH_SIZE: int = 50
+    CHAT_WRITE_FLUSH_INTERVAL: float = 1.0
+    CHAT_WRITE_JOURNAL_PATH: str = ".cache/chat_journal.jsonl"
+    CHAT_WRITE_DEAD_LETTER_PATH: str = ".cache/chat_dead_letter.jsonl"
+
+    # 스트리밍 답변 화면 갱신 (초당 최대 프레임 수, 이만큼 글자가 쌓이면 즉시 갱신)
+    STREAM_MAX_FPS: float = 8.0
+    STREAM_MIN_CHARS: int = 80
+
+    # 컨텍스트 동시 조회 (워커 수, 소스별 동시 조회 수, 소스별 마감 시간(초))
+    CONTEXT_MAX_WORKERS: int = 8
+    CONTEXT_MAX_INFLIGHT_PER_SOURCE: int = 2
+    CONTEXT_DEADLINE_DOCUMENTS: float = 0.5
+    CONTEXT_DEADLINE_WAITING: float = 1.5
+    CONTEXT_DEADLINE_RETRIEVAL: float = 1.0
+
+    # LLM 공급자 공유 HTTP 연결 풀, 모델 목록 캐시 시간(초), 사용자 API 키별 클라이언트 캐시 (최대 개수, 유지 시간(초))
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_KEEPALIVE: int = 10
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_HTTP_TIMEOUT: float = 60.0
+    MODEL_CATALOG_TTL: float = 3600.0
+    USER_CLIENT_CACHE_SIZE: int = 32
+    USER_CLIENT_CACHE_TTL: float = 1800.0
+
+    # LLM 라우터 (자동 선택 사용 여부, 단순 질문 최대 길이, hedge 지연 범위(초), 오류율 상한, 오류 후 재시도 대기(초), 전체 제한 시간(초))
+    # ROUTER_AUTO_ENABLED가 켜져 있을 때만 '자동 선택'을 기본 옵션으로 보여줍니다.
+    ROUTER_AUTO_ENABLED: bool = False
+    ROUTER_SIMPLE_MAX_CHARS: int = 30
+    ROUTER_HEDGE_ENABLED: bool = True
+    ROUTER_HEDGE_MIN_DELAY: float = 1.0
+    ROUTER_HEDGE_MAX_DELAY: float = 5.0
+    ROUTER_MAX_ERROR_RATE: float = 0.5
+    ROUTER_ERROR_COOLDOWN: float = 30.0
+    ROUTER_TOTAL_TIMEOUT: float = 90.0
+
+    # 지표 (로컬 Prometheus 엔드포인트 포트, 0이면 사용 안 함 / 주기적 JSON 저장 경로와 주기(초))
+    METRICS_PORT: int = 9464
+    METRICS_JSON_PATH: str = ".cache/metrics.json"
+    METRICS_DUMP_INTERVAL: float = 60.0
+
+    # 로그 (JSON 파일, 회전 크기/보관 기간/압축, 필드 최대 길이, 이벤트별 샘플링 비율, 체인 상세 출력)
+    LOG_PATH: str = "logs/app.log"
+    LOG_JSON: bool = True
+    LOG_ROTATION: str = "100 MB"
+    LOG_RETENTION: str = "14 days"
+    LOG_COMPRESSION: str = "gz"
+    LOG_CONSOLE_LEVEL: str = "INFO"
+    LOG_MAX_FIELD_CHARS: int = 500
+    LOG_SAMPLE_RATES: Dict[str, float] = {
+        "chat.turn": 1.0,
+        "llm.usage": 0.2,
+        "prompt.tokens": 0.1,
+        "context.gather": 0.1,
+        "pipeline.timings": 0.1,
+        "stream.metrics": 0.1,
+    }
+    LANGCHAIN_VERBOSE: bool = False
+
+    # LLM 호출 입장 제어 (공급자별 동시 호출 수, 대기열 마감 시간(초))
+    ADMISSION_LIMITS: Dict[str, int] = {"openai": 8, "ollama": 2}
+    ADMISSION_DEFAULT_LIMIT: int = 4
+    ADMISSION_QUEUE_TIMEOUT: float = 8.0
+
+    # 식권 주문 기록 시트 (ORDER_LEDGER_SPREADSHEET_ID가 비어 있으면 기록하지 않음)
+    ORDER_LEDGER_SPREADSHEET_ID: str = ""
+    ORDER_LEDGER_RANGE: str = "주문기록!A:G"
+    ORDER_LEDGER_BATCH_SIZE: int = 100
+    ORDER_LEDGER_FLUSH_INTERVAL: float = 5.0
+    ORDER_LEDGER_JOURNAL_PATH: str = ".cache/order_ledger.jsonl"
+
     AGENTS: Dict[str, Dict[str, str]] = {
         "moderator": {
             "role": "대화를 분석하고 다음 발언자를 선택하는 사회자입니다.",
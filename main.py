@@ -2,10 +2,24 @@ import streamlit as st
 from loguru import logger
 from utils import chat, llm, logger_setup, session
 from streaming import StreamHandler
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from utils.googlesheetapi import GoogleAPIManager
+from langchain.memory import ConversationTokenBufferMemory
+from utils.googlesheetapi import GoogleAPIManager, get_quota_guard
 from utils.chat_session_manager import ChatSessionManager
+from utils.chat_backends import SQLiteChatBackend
+from utils.waiting_queue import WaitingQueueCache, make_sheet_fetcher, format_waiting_info
+from utils.memory_store import SessionMemoryStore
+from utils.prompt_builder import PromptBuilder
+from utils.prompt_store import PromptStore
+from utils.store_registry import get_store_registry
+from utils.retrieval import StoreIndex, StoreRetriever
+from utils.context_gatherer import ContextGatherer
+from utils.answer_pipeline import AnswerPipeline
+from utils.admission import AdmissionController
+from utils.sheet_ledger import SheetLedger
+from utils import answer_cache
+from utils.llm_router import flat_backend_stats
+from utils.metrics import metrics, start_metrics_server, start_json_dump
+from config.settings import settings
 import os
 from dotenv import load_dotenv
 
@@ -54,104 +68,204 @@ with example_container:
     if col3.button("📋오늘급식메뉴는 뭔가요?"):
         st.session_state.example_question = "오늘급식메뉴는 뭔가요?"
 
+@st.cache_resource
+def get_waiting_queue_cache(spreadsheet_id: str) -> WaitingQueueCache:
+    """모든 세션이 공유하는 대기 현황 캐시를 생성하고 갱신 스레드를 시작합니다."""
+    cache = WaitingQueueCache(
+        make_sheet_fetcher(GoogleAPIManager(), spreadsheet_id),
+        refresh_interval=settings.WAITING_REFRESH_INTERVAL
+    )
+    cache.start()
+    metrics.register_collector("waiting_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_memory_store() -> SessionMemoryStore:
+    """모든 세션이 공유하는 세션별 대화 메모리 저장소를 생성합니다."""
+    store = SessionMemoryStore(
+        lambda: ConversationTokenBufferMemory(
+            llm=llm.get_token_counter_llm(),
+            max_token_limit=settings.SESSION_MEMORY_MAX_TOKENS
+        ),
+        max_sessions=settings.SESSION_MEMORY_MAX_SESSIONS,
+        idle_timeout=settings.SESSION_MEMORY_IDLE_TIMEOUT
+    )
+    metrics.register_collector("memory_store", store.stats)
+    return store
+
+@st.cache_resource
+def get_prompt_builder() -> PromptBuilder:
+    return PromptBuilder(model=settings.DEFAULT_MODEL, budget_tokens=settings.PROMPT_TOKEN_BUDGET)
+
+@st.cache_resource
+def get_store_retriever() -> StoreRetriever:
+    """디스크에 저장된 매장 문서 색인을 불러와 검색기를 생성합니다."""
+    return StoreRetriever(
+        get_store_registry(),
+        StoreIndex(path=settings.RETRIEVAL_INDEX_PATH),
+        count_tokens=get_prompt_builder().count,
+        top_k=settings.RETRIEVAL_TOP_K,
+        min_doc_tokens=settings.RETRIEVAL_MIN_DOC_TOKENS
+    )
+
+@st.cache_resource
+def get_chat_session_manager() -> ChatSessionManager:
+    """모든 세션이 공유하는 채팅 기록 관리자와 write-behind 큐를 생성합니다."""
+    backend = SQLiteChatBackend(settings.CHAT_SQLITE_PATH) if settings.CHAT_BACKEND == "sqlite" else None
+    manager = ChatSessionManager(SUPABASE_URL, SUPABASE_KEY, backend=backend)
+    manager.enable_write_behind(
+        batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+        flush_interval=settings.CHAT_WRITE_FLUSH_INTERVAL,
+        journal_path=settings.CHAT_WRITE_JOURNAL_PATH,
+        dead_letter_path=settings.CHAT_WRITE_DEAD_LETTER_PATH
+    )
+    metrics.register_collector("write_behind", manager.write_queue.stats)
+    return manager
+
+@st.cache_resource
+def get_prompt_store() -> PromptStore:
+    return PromptStore(get_chat_session_manager())
+
+@st.cache_resource
+def get_answer_cache() -> answer_cache.AnswerCache:
+    """모든 세션이 공유하는 답변 캐시를 생성합니다."""
+    cache = answer_cache.AnswerCache(
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        ttl=settings.ANSWER_CACHE_TTL
+    )
+    metrics.register_collector("answer_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_context_gatherer() -> ContextGatherer:
+    """모든 세션이 공유하는 컨텍스트 조회 스레드 풀을 생성합니다."""
+    return ContextGatherer(
+        max_workers=settings.CONTEXT_MAX_WORKERS,
+        max_inflight_per_source=settings.CONTEXT_MAX_INFLIGHT_PER_SOURCE
+    )
+
+@st.cache_resource
+def get_admission_controller() -> AdmissionController:
+    """모든 세션이 공유하는 공급자별 LLM 동시 호출 제한을 생성합니다."""
+    controller = AdmissionController(
+        limits=settings.ADMISSION_LIMITS,
+        default_limit=settings.ADMISSION_DEFAULT_LIMIT,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT
+    )
+    metrics.register_collector("admission", controller.stats)
+    return controller
+
+@st.cache_resource
+def get_order_ledger() -> SheetLedger:
+    """식권 주문 기록을 모아서 시트에 추가하는 버퍼를 생성합니다."""
+    ledger = SheetLedger(
+        GoogleAPIManager(),
+        batch_size=settings.ORDER_LEDGER_BATCH_SIZE,
+        flush_interval=settings.ORDER_LEDGER_FLUSH_INTERVAL,
+        journal_path=settings.ORDER_LEDGER_JOURNAL_PATH
+    )
+    metrics.register_collector("order_ledger", ledger.stats)
+    return ledger
+
+@st.cache_resource
+def get_answer_pipeline(store_name: str, spreadsheet_id: str) -> AnswerPipeline:
+    """화면과 분리된 답변 생성 과정을 매장마다 하나씩 생성합니다."""
+    return AnswerPipeline(
+        store_name=store_name,
+        store_registry=get_store_registry(),
+        chat_session_manager=get_chat_session_manager(),
+        memory_store=get_memory_store(),
+        prompt_builder=get_prompt_builder(),
+        retriever=get_store_retriever(),
+        context_gatherer=get_context_gatherer(),
+        waiting_cache=get_waiting_queue_cache(spreadsheet_id),
+        answer_cache=get_answer_cache(),
+        prompt_store=get_prompt_store(),
+        documents_deadline=settings.CONTEXT_DEADLINE_DOCUMENTS,
+        waiting_deadline=settings.CONTEXT_DEADLINE_WAITING,
+        retrieval_deadline=settings.CONTEXT_DEADLINE_RETRIEVAL,
+        admission=get_admission_controller(),
+        order_ledger=get_order_ledger() if settings.ORDER_LEDGER_SPREADSHEET_ID else None,
+        order_spreadsheet_id=settings.ORDER_LEDGER_SPREADSHEET_ID,
+        order_range=settings.ORDER_LEDGER_RANGE
+    )
+
+@st.cache_resource
+def start_observability() -> bool:
+    """프로세스당 한 번 지표 엔드포인트와 주기적 JSON 저장을 시작합니다."""
+    metrics.register_collector("llm_router", flat_backend_stats)
+    metrics.register_collector("google_quota", lambda: get_quota_guard().stats())
+    if settings.METRICS_PORT:
+        try:
+            start_metrics_server(settings.METRICS_PORT)
+        except OSError as e:
+            logger.error(f"지표 서버 시작 실패: {str(e)}")
+    if settings.METRICS_JSON_PATH:
+        start_json_dump(settings.METRICS_JSON_PATH, settings.METRICS_DUMP_INTERVAL)
+    return True
+
 class MainChatbot:
     def __init__(self):
         session.sync_st_session()
+        start_observability()
         self.llm = llm.configure_llm()
-        self.sheet_manager = GoogleAPIManager()
         self.SPREADSHEET_ID = "1eJ266ItXio_9haQ2G5wPULYQS5H7dXHgpOZ3cbVaw7s"
-        self.chat_session_manager = ChatSessionManager(SUPABASE_URL, SUPABASE_KEY)
+        self.chat_session_manager = get_chat_session_manager()
         self.store_name = "서울창업허브 3층 그집밥"
+        if get_store_registry().get(self.store_name) is None:
+            logger.error(f"매장 문서를 찾을 수 없습니다: {self.store_name}")
         
         # 세션 ID가 없으면 새로 생성
         if 'session_id' not in st.session_state:
             st.session_state.session_id = self.chat_session_manager.create_session(self.store_name)
             logger.info(f"새 채팅 세션 생성됨: {st.session_state.session_id}")
     
-    def get_waiting_info(self) -> str:
-        """구글 시트에서 대기 인원수 정보를 가져옵니다."""
+    def get_waiting_snapshot(self):
+        """공유 캐시에서 대기 현황 스냅샷을 가져옵니다."""
         try:
-            metadata = self.sheet_manager.get_spreadsheet_metadata(self.SPREADSHEET_ID)
-            if metadata and metadata.get('sheets'):
-                sheet_title = metadata['sheets'][0]['properties']['title']
-                range_name = f"{sheet_title}!A:B"
-                
-                data = self.sheet_manager.read_sheet_data(self.SPREADSHEET_ID, range_name)
-                if data:
-                    waiting_info = "\n현재 대기 현황:\n"
-                    for row in data:
-                        if len(row) >= 2:  # A열과 B열 모두 데이터가 있는 경우
-                            waiting_info += f"- {row[0]}: {row[1]}명\n"
-                    return waiting_info
-            return "\n현재 대기 인원 정보를 확인할 수 없습니다."
+            return get_waiting_queue_cache(self.SPREADSHEET_ID).get()
         except Exception as e:
             logger.error(f"대기 인원 정보 조회 중 오류 발생: {str(e)}")
-            return "\n현재 대기 인원 정보를 확인할 수 없습니다."
+            return None
     
-    @st.cache_resource
-    def setup_chain(_self, max_tokens=1000):
-        memory = ConversationBufferMemory(max_token_limit=max_tokens)
-        chain = ConversationChain(
-            llm=_self.llm, 
-            memory=memory,
-            verbose=True
-        )
-        return chain
+    def get_waiting_info(self) -> str:
+        """공유 캐시에서 대기 인원수 정보를 가져옵니다."""
+        return format_waiting_info(self.get_waiting_snapshot())
     
     def process_user_query(self, user_query):
         """사용자 질문을 처리하고 응답을 생성하는 메서드"""
         chat.display_msg(user_query, 'user')
         with st.chat_message("assistant"):
-            st_cb = StreamHandler(st.empty())
+            st_cb = StreamHandler(
+                st.empty(), max_fps=settings.STREAM_MAX_FPS, min_chars=settings.STREAM_MIN_CHARS
+            )
             try:
-                common_instructions = chat.load_common_instructions()
-                project_instructions = chat.load_project_context(self.store_name)
-                time_info = chat.get_current_time_info()
-                waiting_info = self.get_waiting_info()
-                
-                full_query = f"""
-공통 지시사항:
-{common_instructions}
-
-프로젝트 지시사항:
-{project_instructions}
-
-현재 시간 정보:
-- 날짜: {time_info['date']}
-- 요일: {time_info['weekday']}
-- 시간 (한국): {time_info['time']}
-
-대기 현황 정보:
-{waiting_info}
-
-이전 대화 내용:
-{chat.get_chat_history()}
-
-사용자 질문: {user_query}"""
-                
-                chain = self.setup_chain(1000)
-                result = chain.invoke(
-                    {"input": full_query},
-                    {"callbacks": [st_cb]}
+                result = get_answer_pipeline(self.store_name, self.SPREADSHEET_ID).answer(
+                    st.session_state.session_id, user_query, self.llm, st_cb,
+                    on_queue_position=lambda position: st_cb.container.markdown(
+                        f"⏳ 지금 질문이 많아 잠시 기다리고 있어요. (대기 {position}번째)"
+                    )
                 )
-                response = result["response"]
+                response = result.response
                 
-                # Supabase에 대화 내용 저장
-                self.chat_session_manager.save_message(
-                    session_id=st.session_state.session_id,
-                    role="user",
-                    question={"text": user_query, "full_query": full_query},
-                    answer={"text": response}
-                )
+                # 컨텍스트 조회 지연, 첫 토큰까지 걸린 시간과 초당 토큰 수를 세션에 남깁니다.
+                st.session_state.context_metrics = {
+                    "elapsed_ms": result.context.elapsed_ms,
+                    "latency_ms": result.context.latency_ms,
+                    "status": result.context.status
+                }
+                st.session_state.stream_metrics = st_cb.metrics
+                logger.bind(event="stream.metrics").info(f"스트리밍 지표: {st_cb.metrics}")
                 
                 st.session_state.messages.append({"role": "assistant", "content": response})
-                logger.info(f"사용자 질문: {user_query}")
-                logger.info(f"챗봇 응답: {response}")
-                
-                # 세션 타임스탬프 업데이트
-                self.chat_session_manager.update_session_timestamp(st.session_state.session_id)
+                # 질문/답변 원문은 필드 길이 상한까지만 기록합니다.
+                logger.bind(
+                    event="chat.turn", session_id=st.session_state.session_id, source=result.source,
+                    question=user_query, answer=response
+                ).info("질문 처리 완료")
                 
             except Exception as e:
+                st_cb.finish()
                 error_msg = f"응답 생성 중 오류 발생: {str(e)}"
                 st.error(error_msg)
                 logger.error(error_msg)
@@ -1,11 +1,68 @@
+import time
 from langchain_core.callbacks import BaseCallbackHandler
 
 class StreamHandler(BaseCallbackHandler):
-    
-    def __init__(self, container, initial_text=""):
+    """
+    토큰을 모아 두었다가 초당 max_fps 프레임 이하로만 화면을 갱신합니다.
+    min_chars 이상 쌓이면 바로 그리고, 마지막 텍스트는 finish()/on_llm_end에서 반드시 그립니다.
+    응답별 time-to-first-token과 초당 토큰 수를 metrics로 제공합니다.
+    """
+
+    def __init__(self, container, initial_text="", max_fps: float = 8.0, min_chars: int = 80):
         self.container = container
         self.text = initial_text
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.min_chars = min_chars
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.token_count = 0
+        self.frames = 0
+        self._last_render_at = 0.0
+        self._rendered_len = len(initial_text)
+
+    def on_llm_start(self, *args, **kwargs):
+        self.started_at = time.perf_counter()
+
+    def on_chat_model_start(self, *args, **kwargs):
+        self.started_at = time.perf_counter()
 
     def on_llm_new_token(self, token: str, **kwargs):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.token_count += 1
         self.text += token
-        self.container.markdown(self.text)
\ No newline at end of file
+        pending = len(self.text) - self._rendered_len
+        if self._rendered_len == 0 or now - self._last_render_at >= self.min_interval or pending >= self.min_chars:
+            self._render(now)
+
+    def on_llm_end(self, *args, **kwargs):
+        self.finish()
+
+    def _render(self, now: float):
+        self.container.markdown(self.text)
+        self._last_render_at = now
+        self._rendered_len = len(self.text)
+        self.frames += 1
+
+    def finish(self):
+        """남은 텍스트를 그리고 응답 시간을 기록합니다. 여러 번 호출해도 안전합니다."""
+        now = time.perf_counter()
+        if len(self.text) != self._rendered_len or self.frames == 0:
+            self._render(now)
+        if self.finished_at is None:
+            self.finished_at = now
+
+    @property
+    def metrics(self) -> dict:
+        end = self.finished_at or time.perf_counter()
+        ttft = (self.first_token_at - self.started_at) if self.first_token_at else None
+        streaming_time = (end - self.first_token_at) if self.first_token_at else 0.0
+        return {
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "total_ms": round((end - self.started_at) * 1000, 1),
+            "tokens": self.token_count,
+            "tokens_per_sec": round(self.token_count / streaming_time, 1) if streaming_time > 0 else None,
+            "frames": self.frames,
+        }
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional
+from loguru import logger
+from utils.metrics import metrics
+
+
+class AdmissionTimeout(Exception):
+    """대기열 마감 시간 안에 LLM 호출 차례가 오지 않았습니다."""
+
+
+@dataclass(eq=False)
+class _Waiter:
+    session_id: str
+    granted: bool = False
+
+
+@dataclass
+class _ProviderState:
+    limit: int
+    in_flight: int = 0
+    # 세션별 대기열. 세션 순서대로 한 건씩 돌아가며 허가합니다(round-robin).
+    queues: "OrderedDict[str, Deque[_Waiter]]" = field(default_factory=OrderedDict)
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+
+class AdmissionController:
+    """
+    공급자(openai, ollama 등)별 동시 LLM 호출 수를 제한하는 프로세스 공용 입장 제어기입니다.
+    - 자리가 없으면 세션별 대기열에 넣고, 자리가 나면 세션을 돌아가며 공평하게 허가합니다.
+    - 대기 중에는 on_position 콜백으로 현재 대기 순서를 알려줍니다 (호출한 스레드에서 실행).
+    - queue_timeout 안에 차례가 오지 않으면 AdmissionTimeout을 발생시켜 호출자가 부하를 덜어내게 합니다.
+    """
+
+    def __init__(self, limits: Dict[str, int], default_limit: int = 4, queue_timeout: float = 8.0,
+                 poll_interval: float = 0.5):
+        self.limits = limits
+        self.default_limit = default_limit
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self._providers: Dict[str, _ProviderState] = {}
+        self._cond = threading.Condition()
+        self.admitted_total = 0
+        self.shed_total = 0
+
+    def _state(self, provider: str) -> _ProviderState:
+        state = self._providers.get(provider)
+        if state is None:
+            state = _ProviderState(limit=self.limits.get(provider, self.default_limit))
+            self._providers[provider] = state
+        return state
+
+    @staticmethod
+    def _position(state: _ProviderState, waiter: _Waiter) -> int:
+        """round-robin 허가 순서에서 waiter 앞에 있는 대기 건수 + 1을 반환합니다."""
+        index = state.queues[waiter.session_id].index(waiter)
+        position = 1
+        before_own = True
+        for session_id, queue in state.queues.items():
+            # 앞선 라운드에서 각 세션이 먼저 허가받는 건수
+            position += min(len(queue), index)
+            if session_id == waiter.session_id:
+                before_own = False
+            elif before_own and len(queue) > index:
+                # 같은 라운드에서 순서가 앞선 세션
+                position += 1
+        return position
+
+    def _dispatch(self, state: _ProviderState) -> None:
+        while state.in_flight < state.limit and state.queues:
+            session_id, queue = next(iter(state.queues.items()))
+            waiter = queue.popleft()
+            waiter.granted = True
+            state.in_flight += 1
+            self.admitted_total += 1
+            del state.queues[session_id]
+            if queue:
+                # 남은 요청은 다른 세션들 뒤로 보냅니다.
+                state.queues[session_id] = queue
+        self._cond.notify_all()
+
+    def acquire(self, provider: str, session_id: str,
+                on_position: Optional[Callable[[int], None]] = None) -> float:
+        """자리를 얻을 때까지 기다리고 대기 시간(초)을 반환합니다."""
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        with self._cond:
+            state = self._state(provider)
+            if state.in_flight < state.limit and not state.queues:
+                state.in_flight += 1
+                self.admitted_total += 1
+                metrics.observe("admission_wait_seconds", 0.0, provider=provider)
+                return 0.0
+            waiter = _Waiter(session_id)
+            state.queues.setdefault(session_id, deque()).append(waiter)
+
+        last_position = None
+        while True:
+            with self._cond:
+                if waiter.granted:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    queue = state.queues.get(session_id)
+                    if queue is not None:
+                        queue.remove(waiter)
+                        if not queue:
+                            del state.queues[session_id]
+                    self.shed_total += 1
+                    metrics.inc("admission_shed_total", provider=provider)
+                    raise AdmissionTimeout(f"{provider} 대기열 {self.queue_timeout:.0f}초 초과")
+                position = self._position(state, waiter)
+            # 화면 갱신 등 콜백은 잠금 밖에서 실행합니다.
+            if on_position is not None and position != last_position:
+                on_position(position)
+                last_position = position
+            with self._cond:
+                if not waiter.granted:
+                    self._cond.wait(min(remaining, self.poll_interval))
+
+        waited = time.monotonic() - started
+        metrics.observe("admission_wait_seconds", waited, provider=provider)
+        logger.debug(f"LLM 호출 허가 ({provider}, 대기 {waited:.2f}초)")
+        return waited
+
+    def try_acquire(self, provider: str) -> bool:
+        """기다리지 않고 바로 자리가 있을 때만 허가합니다 (hedge처럼 없어도 되는 요청용)."""
+        with self._cond:
+            state = self._state(provider)
+            if state.in_flight < state.limit and not state.queues:
+                state.in_flight += 1
+                self.admitted_total += 1
+                return True
+            return False
+
+    def release(self, provider: str) -> None:
+        with self._cond:
+            state = self._state(provider)
+            state.in_flight = max(0, state.in_flight - 1)
+            self._dispatch(state)
+
+    @contextmanager
+    def admit(self, provider: str, session_id: str, on_position: Optional[Callable[[int], None]] = None):
+        self.acquire(provider, session_id, on_position)
+        try:
+            yield
+        finally:
+            self.release(provider)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            stats = {"admitted_total": self.admitted_total, "shed_total": self.shed_total}
+            for provider, state in self._providers.items():
+                stats[f"{provider}_in_flight"] = state.in_flight
+                stats[f"{provider}_queued"] = state.queued()
+                stats[f"{provider}_limit"] = state.limit
+        return stats
@@ -0,0 +1,99 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from loguru import logger
+
+# 질문이나 답변에 이 단어가 있으면 대기 인원수에 따라 답이 달라지는 것으로 봅니다.
+WAITING_KEYWORDS = ("대기", "줄", "기다", "몇 명", "몇명")
+
+
+def normalize_query(query: str) -> str:
+    """대소문자, 공백, 문장부호, 이모지 차이를 없앤 질문 문자열을 만듭니다."""
+    return re.sub(r"[^\w]", "", query.lower())
+
+
+def depends_on_waiting(query: str, answer: str) -> bool:
+    return any(keyword in query or keyword in answer for keyword in WAITING_KEYWORDS)
+
+
+@dataclass
+class CachedAnswer:
+    text: str
+    expires_at: float
+    waiting_version: Optional[int] = None
+
+
+class AnswerCache:
+    """
+    자주 반복되는 질문의 답변을 (매장, 날짜, 요일, 정규화된 질문, 문서 해시) 단위로 보관합니다.
+    TTL이 지나거나 최대 개수를 넘으면 오래된 항목부터 제거합니다.
+    대기 인원수에 의존하는 답변은 대기 현황 버전이 바뀌면 무효화됩니다.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(store_name: str, date: str, weekday: str, query: str, document_hash: str) -> Tuple:
+        return (store_name, date, weekday, normalize_query(query), document_hash)
+
+    def get(self, key: Tuple, waiting_version: Optional[int] = None) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stale = entry.expires_at < time.monotonic()
+                waiting_changed = entry.waiting_version is not None and entry.waiting_version != waiting_version
+                if stale or waiting_changed:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.text
+
+    def put(self, key: Tuple, text: str, waiting_version: Optional[int] = None) -> None:
+        """waiting_version을 넘기면 해당 대기 현황 버전에서만 유효한 답변으로 저장합니다."""
+        with self._lock:
+            self._entries[key] = CachedAnswer(
+                text=text,
+                expires_at=time.monotonic() + self.ttl,
+                waiting_version=waiting_version,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_waiting(self) -> None:
+        """대기 인원수에 의존하는 답변을 모두 지웁니다."""
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if v.waiting_version is not None]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def replay(text: str, handler, chunk_size: Optional[int] = 4, delay: float = 0.0) -> None:
+    """
+    캐시된 답변을 StreamHandler에 조각 단위로 흘려보내 스트리밍처럼 표시합니다.
+    화면 갱신 빈도는 StreamHandler가 조절하므로 기본값은 지연 없이 보냅니다.
+    chunk_size가 None이면 한 번에 전부 보냅니다 (즉답용).
+    """
+    step = chunk_size or max(1, len(text))
+    for i in range(0, len(text), step):
+        handler.on_llm_new_token(text[i:i + step])
+        if delay:
+            time.sleep(delay)
+    handler.finish()
+    logger.debug(f"캐시된 답변 재생됨 ({len(text)}자)")
@@ -0,0 +1,295 @@
+import hashlib
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+from loguru import logger
+from utils import answer_cache, chat, menu
+from utils.admission import AdmissionController, AdmissionTimeout
+from utils.llm import extract_usage
+from utils.metrics import metrics
+from utils.sheet_ledger import SheetLedger
+from utils.context_gatherer import ContextGatherer, ContextSource, GatherResult
+from utils.prompt_builder import BuiltPrompt, PromptBuilder
+from utils.store_registry import COMMON_INSTRUCTIONS_NAME
+from utils.waiting_queue import format_waiting_info
+
+# LLM 대기열이 넘칠 때 보여주는 안내 문구
+SHED_MESSAGE = "지금 문의가 많아 답변이 늦어지고 있어요. 식권 주문과 오늘 메뉴는 바로 안내해 드릴 수 있으니 잠시 후 다시 질문해 주세요."
+
+
+@dataclass
+class AnswerResult:
+    response: str
+    # 답변 출처: fast_path, cache, shed(부하 경감) 또는 응답한 LLM 백엔드 이름
+    source: str
+    # 즉답(fast_path)은 컨텍스트 조회와 프롬프트 조립을 건너뛰므로 비어 있습니다.
+    prompt: Optional[BuiltPrompt] = None
+    context: GatherResult = field(default_factory=GatherResult)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+class AnswerPipeline:
+    """
+    질문 하나에 대한 답변 생성 과정(컨텍스트 조회 → 프롬프트 조립 → 즉답/캐시/LLM → 저장)입니다.
+    Streamlit API를 사용하지 않으므로 화면 없이 부하 테스트에서도 그대로 실행할 수 있습니다.
+    공유 객체만 가지며 세션별 상태는 session_id로 구분합니다.
+    """
+
+    def __init__(self, store_name: str, store_registry, chat_session_manager, memory_store,
+                 prompt_builder: PromptBuilder, retriever, context_gatherer: ContextGatherer, waiting_cache,
+                 answer_cache: answer_cache.AnswerCache, prompt_store,
+                 documents_deadline: float = 0.5, waiting_deadline: float = 1.5, retrieval_deadline: float = 1.0,
+                 admission: Optional[AdmissionController] = None,
+                 order_ledger: Optional[SheetLedger] = None, order_spreadsheet_id: str = "",
+                 order_range: str = ""):
+        self.store_name = store_name
+        self.store_registry = store_registry
+        self.chat_session_manager = chat_session_manager
+        self.memory_store = memory_store
+        self.prompt_builder = prompt_builder
+        self.retriever = retriever
+        self.context_gatherer = context_gatherer
+        self.waiting_cache = waiting_cache
+        self.answer_cache = answer_cache
+        self.prompt_store = prompt_store
+        self.documents_deadline = documents_deadline
+        self.waiting_deadline = waiting_deadline
+        self.retrieval_deadline = retrieval_deadline
+        self.admission = admission
+        self.order_ledger = order_ledger
+        self.order_spreadsheet_id = order_spreadsheet_id
+        self.order_range = order_range
+
+    def get_document_hash(self) -> str:
+        """공통 지시사항과 매장 문서의 내용 해시를 합친 값입니다."""
+        hashes = self.store_registry.content_hashes()
+        return f"{hashes.get(COMMON_INSTRUCTIONS_NAME, '')}:{hashes.get(self.store_name, '')}"
+
+    def gather_context(self, user_query: str, last_user_turn: str) -> GatherResult:
+        # 서로 독립적인 컨텍스트를 동시에 가져오고, 마감을 넘긴 소스는 마지막 값으로 대신합니다.
+        retrieval_query = f"{last_user_turn} {user_query}"
+        return self.context_gatherer.gather([
+            ContextSource(
+                "common_instructions", chat.load_common_instructions,
+                deadline=self.documents_deadline,
+                fallback="공통 지시사항을 불러오는데 실패했습니다.",
+                cache_key=COMMON_INSTRUCTIONS_NAME
+            ),
+            ContextSource(
+                "store_document", lambda: chat.load_project_context(self.store_name),
+                deadline=self.documents_deadline,
+                fallback="컨텍스트를 불러오는데 실패했습니다.",
+                cache_key=f"store_document:{self.store_name}"
+            ),
+            ContextSource(
+                "waiting", self.waiting_cache.get,
+                deadline=self.waiting_deadline,
+                cache_key=f"waiting:{self.store_name}"
+            ),
+            # 긴 매장 문서는 질문(과 직전 질문)에 관련된 부분만 넣습니다.
+            ContextSource(
+                "retrieval",
+                lambda: self.retriever.context_for(self.store_name, retrieval_query),
+                deadline=self.retrieval_deadline,
+                fallback=("", ""),
+                cache_key=f"retrieval:{self.store_name}:{hashlib.sha1(retrieval_query.encode('utf-8')).hexdigest()}"
+            ),
+        ])
+
+    def generate(self, llm, prompt: BuiltPrompt, handler, session_id: str, user_query: str,
+                 on_queue_position: Optional[Callable[[int], None]] = None) -> Tuple[str, str, Dict[str, int]]:
+        """
+        공급자별 동시 호출 제한 안에서 LLM 답변을 스트리밍합니다.
+        라우터가 hedge/전환 요청을 포함해 백엔드마다 해당 공급자의 자리를 얻습니다.
+        차례가 오지 않으면 AdmissionTimeout이 발생합니다.
+        """
+        # 라우터가 질문 종류와 백엔드별 지연/오류율에 따라 모델을 고르고, 느리면 hedge 요청을 보냅니다.
+        result, source = llm.invoke(
+            prompt.messages, handler=handler, user_query=user_query,
+            admission=self.admission, session_id=session_id, on_queue_position=on_queue_position
+        )
+        usage = extract_usage(result)
+        logger.bind(event="llm.usage", backend=source, **usage).info(
+            f"LLM 사용량 ({source}): 입력 {usage['input_tokens']} (캐시 {usage['cached_tokens']}), "
+            f"출력 {usage['output_tokens']}"
+        )
+        handler.finish()
+        stream = handler.metrics
+        if stream["ttft_ms"] is not None:
+            metrics.observe("llm_ttft_seconds", stream["ttft_ms"] / 1000, backend=source)
+        metrics.observe("llm_seconds", stream["total_ms"] / 1000, backend=source)
+        for kind in ("input", "output", "cached"):
+            metrics.inc("llm_tokens_total", usage[f"{kind}_tokens"], backend=source, kind=kind)
+        return result.content, source, usage
+
+    def shed_response(self, user_query: str, time_info: Dict[str, str], waiting_info: str,
+                      waiting_version: Optional[int]) -> str:
+        """같은 질문의 캐시된 답변이 있으면 그것을, 없으면 안내 문구(대기 질문이면 대기 현황 포함)를 반환합니다."""
+        key = answer_cache.AnswerCache.make_key(
+            self.store_name, time_info['date'], time_info['weekday'], user_query, self.get_document_hash()
+        )
+        cached = self.answer_cache.get(key, waiting_version)
+        if cached is not None:
+            return cached
+        if answer_cache.depends_on_waiting(user_query, ""):
+            return f"{SHED_MESSAGE}\n{waiting_info}"
+        return SHED_MESSAGE
+
+    def record_order(self, session_id: str, turn_id: str, user_query: str, store_document: str,
+                     time_info: Dict[str, str]) -> None:
+        """즉답한 식권 주문을 주문 기록 시트 버퍼에 넣습니다. 같은 턴(turn_id)은 한 번만 기록됩니다."""
+        count = menu.ticket_order_count(user_query)
+        if self.order_ledger is None or not self.order_spreadsheet_id or count is None:
+            return
+        ticket_price = menu.parse_store_document(store_document).ticket_price or 0
+        self.order_ledger.append(
+            self.order_spreadsheet_id, self.order_range,
+            [time_info['date'], time_info['time'], self.store_name, session_id, count, count * ticket_price],
+            key=f"{session_id}:{turn_id}"
+        )
+
+    def answer(self, session_id: str, user_query: str, llm, handler,
+               time_info: Optional[Dict[str, str]] = None,
+               on_queue_position: Optional[Callable[[int], None]] = None,
+               turn_id: Optional[str] = None) -> AnswerResult:
+        """
+        llm은 LLMRouter, handler는 StreamHandler(또는 같은 메서드를 가진 객체)입니다.
+        답변은 handler로 스트리밍하고 대화 메모리와 채팅 기록에 저장한 뒤 결과를 반환합니다.
+        LLM 호출 대기 중에는 on_queue_position(대기 순서)이 호출 스레드에서 불립니다.
+        turn_id는 제출된 질문 하나를 가리키는 키로, 같은 질문을 다시 처리할 때 넘기면 주문이 중복 기록되지 않습니다.
+        주지 않으면 새로 만듭니다. (대화 길이는 메모리 정리/만료로 줄어들 수 있어 키로 쓰지 않습니다.)
+        """
+        timings: Dict[str, float] = {}
+        stage_started = time.perf_counter()
+
+        def lap(stage: str) -> None:
+            nonlocal stage_started
+            now = time.perf_counter()
+            timings[stage] = round((now - stage_started) * 1000, 1)
+            metrics.observe("stage_seconds", now - stage_started, stage=stage)
+            stage_started = now
+
+        time_info = time_info or chat.get_current_time_info()
+
+        # 이전 대화는 세션 메모리에 저장된 질문/응답 원문만 한 번 포함합니다.
+        memory = self.memory_store.get(session_id)
+        history = [(m.type, m.content) for m in memory.chat_memory.messages]
+
+        # 식권 주문/오늘 메뉴처럼 매장 문서만으로 답할 수 있으면 컨텍스트 조회와 LLM을 모두 건너뜁니다.
+        # 매장 문서와 공통 지시사항은 메모리의 문서 목록에서 바로 읽습니다.
+        store_document = chat.load_project_context(self.store_name)
+        fast_response = menu.answer_fast_path(
+            user_query, store_document, chat.load_common_instructions(), time_info
+        )
+
+        prompt: Optional[BuiltPrompt] = None
+        context = GatherResult()
+        usage: Dict[str, int] = {}
+        if fast_response is not None:
+            lap("lookup")
+            logger.info("매장 문서 기반 즉답 처리")
+            # 매장 문서 기반 즉답은 스트리밍 효과 없이 바로 표시합니다.
+            answer_cache.replay(fast_response, handler, chunk_size=None)
+            response, source = fast_response, "fast_path"
+            self.record_order(session_id, turn_id or uuid.uuid4().hex, user_query, store_document, time_info)
+        else:
+            last_user_turn = next((c for r, c in reversed(history) if r == "human"), "")
+            context = self.gather_context(user_query, last_user_turn)
+            logger.bind(event="context.gather").info(
+                f"컨텍스트 조회 {context.elapsed_ms}ms (소스별: {context.latency_ms}, 상태: {context.status})"
+            )
+            for name, latency_ms in context.latency_ms.items():
+                metrics.observe("context_source_seconds", latency_ms / 1000, source=name)
+                if context.status[name] != "ok":
+                    metrics.inc("context_degraded_total", source=name, status=context.status[name])
+            common_instructions = context.values["common_instructions"]
+            store_document = context.values["store_document"]
+            waiting_snapshot = context.values["waiting"]
+            waiting_info = format_waiting_info(waiting_snapshot)
+            waiting_version = waiting_snapshot.version if waiting_snapshot else None
+            project_instructions, retrieved_context = context.values["retrieval"]
+            if not project_instructions:
+                project_instructions = store_document
+            lap("context")
+
+            prompt = self.prompt_builder.build(
+                common_instructions=common_instructions,
+                project_instructions=project_instructions,
+                time_info=time_info,
+                waiting_info=waiting_info,
+                history=history,
+                user_query=user_query,
+                retrieved_context=retrieved_context
+            )
+            logger.bind(event="prompt.tokens").info(
+                f"프롬프트 토큰: {prompt.total_tokens} "
+                f"(섹션별: {prompt.section_tokens}, 제외된 대화: {prompt.dropped_turns})"
+            )
+            lap("prompt")
+
+            # 첫 질문은 대화 맥락이 없으므로 같은 질문의 답변을 재사용할 수 있습니다.
+            cache_key = None
+            cached_response = None
+            if not history:
+                cache_key = answer_cache.AnswerCache.make_key(
+                    self.store_name, time_info['date'], time_info['weekday'],
+                    user_query, self.get_document_hash()
+                )
+                cached_response = self.answer_cache.get(cache_key, waiting_version)
+            lap("lookup")
+
+            if cached_response is not None:
+                logger.info("답변 캐시 적중")
+                answer_cache.replay(cached_response, handler)
+                response, source = cached_response, "cache"
+            else:
+                try:
+                    response, source, usage = self.generate(
+                        llm, prompt, handler, session_id, user_query, on_queue_position
+                    )
+                except AdmissionTimeout as e:
+                    # 대기열 마감을 넘기면 캐시된 답변이나 안내 문구로 부하를 덜어냅니다.
+                    logger.warning(f"대기열 초과로 부하 경감 응답: {str(e)}")
+                    response = self.shed_response(user_query, time_info, waiting_info, waiting_version)
+                    source = "shed"
+                    answer_cache.replay(response, handler)
+                else:
+                    if cache_key is not None:
+                        depends = answer_cache.depends_on_waiting(user_query, response)
+                        # 대기 현황 버전을 모르면 무효화할 수 없으므로 대기 인원에 의존하는 답변은 저장하지 않습니다.
+                        if not depends or waiting_version is not None:
+                            self.answer_cache.put(cache_key, response, waiting_version if depends else None)
+        metrics.inc("answers_total", source=source if source in ("fast_path", "cache", "shed") else "llm")
+        lap("generate")
+
+        # 부하 경감 안내 문구는 실제 답변이 아니므로 대화 메모리와 채팅 기록에 남기지 않습니다.
+        if source != "shed":
+            memory.save_context({"input": user_query}, {"output": response})
+
+            # 대화 내용 저장 (고정 프롬프트는 해시 참조로만 저장, 즉답은 프롬프트 없음)
+            question = {"text": user_query}
+            if prompt is not None:
+                question["prompt"] = self.prompt_store.snapshot(prompt)
+            self.chat_session_manager.save_message(
+                session_id=session_id,
+                role="user",
+                question=question,
+                answer={"text": response}
+            )
+            self.chat_session_manager.update_session_timestamp(session_id)
+        lap("persist")
+
+        timings["total"] = round(sum(timings.values()), 1)
+        metrics.observe("answer_seconds", timings["total"] / 1000)
+        logger.bind(event="pipeline.timings", session_id=session_id).info(f"단계별 처리 시간(ms): {timings}")
+        return AnswerResult(
+            response=response,
+            source=source,
+            prompt=prompt,
+            context=context,
+            timings_ms=timings,
+            usage=usage,
+        )
+
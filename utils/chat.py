@@ -1,8 +1,8 @@
 import streamlit as st
 from datetime import datetime
 import pytz
-import os
 from loguru import logger
+from utils.store_registry import get_store_registry, COMMON_INSTRUCTIONS_NAME
 
 def enable_chat_history(func):
     def wrapper(*args, **kwargs):
@@ -49,17 +49,15 @@ def get_current_time_info():
     }
 
 def load_common_instructions():
-    try:
-        with open("store_infos/공통지시사항.md", 'r', encoding='utf-8') as file:
-            return file.read()
-    except Exception as e:
-        logger.error(f"공통 지시사항 로드 중 오류 발생: {str(e)}")
+    document = get_store_registry().get(COMMON_INSTRUCTIONS_NAME)
+    if document is None:
+        logger.error("공통 지시사항 로드 중 오류 발생: 문서를 찾을 수 없습니다.")
         return "공통 지시사항을 불러오는데 실패했습니다."
+    return document.content
 
 def load_project_context(store_name):
-    try:
-        with open(f"store_infos/{store_name}.md", 'r', encoding='utf-8') as file:
-            return file.read()
-    except Exception as e:
-        logger.error(f"프로젝트 컨텍스트 로드 중 오류 발생: {str(e)}")
+    document = get_store_registry().get(store_name)
+    if document is None:
+        logger.error(f"프로젝트 컨텍스트 로드 중 오류 발생: {store_name} 문서를 찾을 수 없습니다.")
         return "컨텍스트를 불러오는데 실패했습니다."
+    return document.content
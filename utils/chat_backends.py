@@ -0,0 +1,233 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+
+# 조회 시 선택할 수 있는 컬럼. 'question.text'처럼 JSON 안의 값만 가져올 수도 있습니다.
+MESSAGE_COLUMNS = ("id", "session_id", "role", "created_at", "question", "answer", "question.text", "answer.text")
+# keyset 페이지네이션에 필요한 컬럼은 항상 포함합니다.
+KEYSET_COLUMNS = ("id", "session_id", "created_at")
+
+
+def resolve_columns(columns: Optional[Sequence[str]]) -> List[str]:
+    if not columns:
+        return list(MESSAGE_COLUMNS[:6])
+    unknown = [c for c in columns if c not in MESSAGE_COLUMNS]
+    if unknown:
+        raise ValueError(f"지원하지 않는 컬럼입니다: {unknown}")
+    return list(KEYSET_COLUMNS) + [c for c in columns if c not in KEYSET_COLUMNS]
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """
+    다시 보내도 성공하지 않을 오류(제약 조건 위반, 잘못된 값/요청)인지 판단합니다.
+    Postgres 오류 코드 22xxx(데이터), 23xxx(무결성), 42xxx(문법/권한)와 SQLite의 같은 종류 오류가 해당됩니다.
+    """
+    if isinstance(error, (sqlite3.IntegrityError, sqlite3.DataError, sqlite3.ProgrammingError,
+                          sqlite3.InterfaceError, ValueError, TypeError)):
+        return True
+    code = str(getattr(error, "code", "") or "")
+    return code[:2] in ("22", "23", "42")
+
+
+def output_name(column: str) -> str:
+    """'question.text' 같은 JSON 경로 컬럼은 'question_text' 키로 돌려줍니다."""
+    return column.replace(".", "_")
+
+
+class SupabaseChatBackend:
+    """
+    chat_sessions / chat_messages 테이블에 대한 Supabase 저장소입니다.
+    모든 쓰기는 여러 행을 한 번의 요청으로 처리합니다.
+    chat_messages에는 unique 제약이 있는 client_id(text) 컬럼이 필요합니다.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def insert_sessions(self, rows: List[Dict]) -> None:
+        if rows:
+            # 재시도 시 중복되지 않도록 id 기준 upsert를 사용합니다.
+            self.client.table('chat_sessions').upsert(rows).execute()
+
+    def insert_messages(self, rows: List[Dict]) -> None:
+        if rows:
+            # client_id(클라이언트에서 만든 uuid, unique) 기준으로 이미 저장된 메시지는 무시해 재시도해도 중복되지 않습니다.
+            self.client.table('chat_messages').upsert(
+                rows, on_conflict='client_id', ignore_duplicates=True
+            ).execute()
+
+    def update_session_timestamps(self, updates: Dict[str, str]) -> None:
+        for session_id, updated_at in updates.items():
+            self.client.table('chat_sessions').update({
+                'updated_at': updated_at
+            }).eq('id', session_id).execute()
+
+    def insert_blobs(self, rows: List[Dict]) -> None:
+        if rows:
+            # 같은 해시는 같은 내용이므로 이미 있으면 무시합니다.
+            self.client.table('prompt_blobs').upsert(rows, ignore_duplicates=True).execute()
+
+    def select_blobs(self, hashes: Sequence[str]) -> Dict[str, str]:
+        if not hashes:
+            return {}
+        result = self.client.table('prompt_blobs').select('hash,content').in_('hash', list(hashes)).execute()
+        return {row['hash']: row['content'] for row in result.data}
+
+    def select_messages(self, session_id: str) -> List[Dict]:
+        result = self.client.table('chat_messages')\
+            .select('*')\
+            .eq('session_id', session_id)\
+            .order('created_at')\
+            .execute()
+        return result.data
+
+    def select_messages_page(self, session_ids: Sequence[str], columns: Optional[Sequence[str]] = None,
+                             after: Optional[Tuple[str, int]] = None, limit: int = 100) -> List[Dict]:
+        """
+        (created_at, id) 기준 keyset 페이지네이션으로 메시지를 limit개씩 읽습니다.
+        after에는 이전 페이지 마지막 행의 (created_at, id)를 넘깁니다.
+        """
+        select = ",".join(
+            f"{output_name(c)}:{c.split('.')[0]}->>{c.split('.')[1]}" if "." in c else c
+            for c in resolve_columns(columns)
+        )
+        query = self.client.table('chat_messages').select(select).in_('session_id', list(session_ids))
+        if after is not None:
+            created_at, last_id = after
+            query = query.or_(
+                f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{last_id})'
+            )
+        result = query.order('created_at').order('id').limit(limit).execute()
+        return result.data
+
+
+class SQLiteChatBackend:
+    """
+    Supabase 대신 로컬에서 사용할 수 있는 SQLite 저장소입니다.
+    오프라인 테스트와 부하 테스트용이며 SupabaseChatBackend와 같은 메서드를 제공합니다.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    id TEXT PRIMARY KEY,
+                    store_name TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL REFERENCES chat_sessions(id),
+                    role TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_chat_messages_session
+                    ON chat_messages(session_id, created_at, id);
+                CREATE TABLE IF NOT EXISTS prompt_blobs (
+                    hash TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                );
+            """)
+            # 예전 파일에는 client_id 컬럼이 없으므로 추가합니다.
+            message_columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(chat_messages)")}
+            if 'client_id' not in message_columns:
+                self._conn.execute("ALTER TABLE chat_messages ADD COLUMN client_id TEXT")
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_messages_client_id ON chat_messages(client_id)"
+            )
+        logger.info(f"SQLite 채팅 저장소 사용: {path}")
+
+    def insert_sessions(self, rows: List[Dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chat_sessions (id, store_name, created_at, updated_at) "
+                "VALUES (:id, :store_name, :created_at, :updated_at)",
+                rows
+            )
+
+    def insert_messages(self, rows: List[Dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chat_messages (client_id, session_id, role, question, answer, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (r.get('client_id'), r['session_id'], r['role'], json.dumps(r['question'], ensure_ascii=False),
+                     json.dumps(r['answer'], ensure_ascii=False), r['created_at'])
+                    for r in rows
+                ]
+            )
+
+    def update_session_timestamps(self, updates: Dict[str, str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE chat_sessions SET updated_at = ? WHERE id = ?",
+                [(updated_at, session_id) for session_id, updated_at in updates.items()]
+            )
+
+    def insert_blobs(self, rows: List[Dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO prompt_blobs (hash, content, created_at) "
+                "VALUES (:hash, :content, :created_at)",
+                rows
+            )
+
+    def select_blobs(self, hashes: Sequence[str]) -> Dict[str, str]:
+        if not hashes:
+            return {}
+        placeholders = ", ".join("?" for _ in hashes)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash, content FROM prompt_blobs WHERE hash IN ({placeholders})", list(hashes)
+            ).fetchall()
+        return {row['hash']: row['content'] for row in rows}
+
+    def select_messages(self, session_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM chat_messages WHERE session_id = ? ORDER BY created_at, id",
+                (session_id,)
+            ).fetchall()
+        return [
+            {**dict(row), 'question': json.loads(row['question']), 'answer': json.loads(row['answer'])}
+            for row in rows
+        ]
+
+    def select_messages_page(self, session_ids: Sequence[str], columns: Optional[Sequence[str]] = None,
+                             after: Optional[Tuple[str, int]] = None, limit: int = 100) -> List[Dict]:
+        columns = resolve_columns(columns)
+        select = ", ".join(
+            f"json_extract({c.split('.')[0]}, '$.{c.split('.')[1]}') AS {output_name(c)}" if "." in c else c
+            for c in columns
+        )
+        placeholders = ", ".join("?" for _ in session_ids)
+        sql = f"SELECT {select} FROM chat_messages WHERE session_id IN ({placeholders})"
+        params: List = list(session_ids)
+        if after is not None:
+            sql += " AND (created_at > ? OR (created_at = ? AND id > ?))"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY created_at, id LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            record = dict(row)
+            for key in ('question', 'answer'):
+                if key in record:
+                    record[key] = json.loads(record[key])
+            results.append(record)
+        return results
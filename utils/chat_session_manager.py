@@ -1,76 +1,159 @@
+import uuid
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterator, List, Sequence
 from loguru import logger
 from supabase import Client, create_client
 from pydantic import BaseModel
+from utils.resources import registry, fingerprint
+from utils.chat_backends import SupabaseChatBackend
+from utils.write_behind import WriteBehindQueue
+from utils.metrics import metrics
 
 class ChatMessage(BaseModel):
     role: str
     question: Dict
     answer: Dict
 
+def get_supabase_client(supabase_url: str, supabase_key: str) -> Client:
+    """Supabase 클라이언트를 (URL, Key) 조합마다 프로세스당 한 번만 생성합니다."""
+    return registry.get_or_create(
+        ('supabase', supabase_url, fingerprint(supabase_key)),
+        lambda: create_client(supabase_url, supabase_key)
+    )
+
 class ChatSessionManager:
-    def __init__(self, supabase_url: str, supabase_key: str):
-        if not supabase_url or not supabase_key:
-            raise ValueError("Supabase URL과 Key는 필수값입니다.")
-        self.supabase: Client = create_client(supabase_url, supabase_key)
-        logger.info("ChatSessionManager 초기화됨")
+    """
+    채팅 세션과 메시지를 저장합니다.
+    write_queue가 있으면 쓰기는 백그라운드에서 묶어서 저장되고, 호출은 바로 반환됩니다.
+    backend를 넘기지 않으면 Supabase 저장소를 사용합니다.
+    """
+    def __init__(self, supabase_url: Optional[str] = None, supabase_key: Optional[str] = None,
+                 backend=None, write_queue: Optional[WriteBehindQueue] = None):
+        if backend is None:
+            if not supabase_url or not supabase_key:
+                raise ValueError("Supabase URL과 Key는 필수값입니다.")
+            backend = SupabaseChatBackend(get_supabase_client(supabase_url, supabase_key))
+        self.backend = backend
+        self.write_queue = write_queue
+        logger.debug("ChatSessionManager 초기화됨")
+
+    def enable_write_behind(self, **queue_options) -> WriteBehindQueue:
+        """이후 쓰기를 백그라운드 write-behind 큐로 보냅니다."""
+        if self.write_queue is None:
+            self.write_queue = WriteBehindQueue(self.backend, **queue_options)
+        return self.write_queue
 
+    @metrics.timed()
     def create_session(self, store_name: str) -> str:
         if not store_name:
             raise ValueError("store_name은 필수값입니다.")
         try:
+            # 세션 ID를 클라이언트에서 만들어 저장을 기다리지 않고 바로 사용합니다.
+            session_id = str(uuid.uuid4())
             current_time = datetime.utcnow().isoformat()
-            result = self.supabase.table('chat_sessions').insert({
+            row = {
+                'id': session_id,
                 'store_name': store_name,
                 'created_at': current_time,
                 'updated_at': current_time
-            }).execute()
-            session_id = result.data[0]['id']
+            }
+            if self.write_queue:
+                self.write_queue.enqueue_session(row)
+            else:
+                self.backend.insert_sessions([row])
             logger.info(f"새 채팅 세션 생성됨: {{'session_id': '{session_id}', 'store_name': '{store_name}'}}")
             return session_id
         except Exception as e:
             logger.error(f"채팅 세션 생성 실패: {str(e)}")
             raise
 
+    @metrics.timed()
     def save_message(self, session_id: str, role: str, question: Dict, answer: Dict) -> None:
         if not session_id or not role:
             raise ValueError("session_id와 role은 필수값입니다.")
         if not isinstance(question, dict) or not isinstance(answer, dict):
             raise TypeError("question과 answer는 딕셔너리 형태여야 합니다.")
         try:
-            self.supabase.table('chat_messages').insert({
+            row = {
+                # 재시도/journal 재저장 시 중복 저장을 막는 멱등 키
+                'client_id': str(uuid.uuid4()),
                 'session_id': session_id,
                 'role': role,
                 'question': question,
-                'answer': answer
-            }).execute()
+                'answer': answer,
+                'created_at': datetime.utcnow().isoformat()
+            }
+            if self.write_queue:
+                self.write_queue.enqueue_message(row)
+            else:
+                self.backend.insert_messages([row])
             logger.info(f"메시지 저장됨: {{'session_id': '{session_id}', 'role': '{role}'}}")
         except Exception as e:
             logger.error(f"메시지 저장 실패: {str(e)}")
             raise
 
+    @metrics.timed()
     def get_session_messages(self, session_id: str):
         if not session_id:
             raise ValueError("session_id는 필수값입니다.")
         try:
-            result = self.supabase.table('chat_messages')\
-                .select('*')\
-                .eq('session_id', session_id)\
-                .order('created_at')\
-                .execute()
-            return result.data
+            # 아직 저장되지 않은 쓰기가 있으면 먼저 반영합니다.
+            if self.write_queue:
+                self.write_queue.flush()
+            return self.backend.select_messages(session_id)
         except Exception as e:
             logger.error(f"세션 메시지 조회 실패: {str(e)}")
             raise
 
+    def iter_messages(self, session_ids: Sequence[str], columns: Optional[Sequence[str]] = None,
+                      page_size: int = 100) -> Iterator[List[Dict]]:
+        """
+        여러 세션의 메시지를 (created_at, id) keyset 페이지 단위로 읽어옵니다.
+        columns로 필요한 컬럼만 선택할 수 있습니다. 예: ['question.text', 'answer.text']
+        """
+        if not session_ids:
+            raise ValueError("session_ids는 필수값입니다.")
+        if self.write_queue:
+            self.write_queue.flush()
+        after = None
+        while True:
+            try:
+                page = self.backend.select_messages_page(session_ids, columns=columns, after=after, limit=page_size)
+            except Exception as e:
+                logger.error(f"세션 메시지 페이지 조회 실패: {str(e)}")
+                raise
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = (page[-1]['created_at'], page[-1]['id'])
+
+    def iter_session_messages(self, session_id: str, columns: Optional[Sequence[str]] = None,
+                              page_size: int = 100) -> Iterator[List[Dict]]:
+        if not session_id:
+            raise ValueError("session_id는 필수값입니다.")
+        return self.iter_messages([session_id], columns=columns, page_size=page_size)
+
+    @metrics.timed()
+    def get_sessions_messages(self, session_ids: Sequence[str], columns: Optional[Sequence[str]] = None,
+                              page_size: int = 500) -> Dict[str, List[Dict]]:
+        """여러 세션의 메시지를 한꺼번에 읽어 세션 ID별로 묶어 반환합니다."""
+        grouped: Dict[str, List[Dict]] = {session_id: [] for session_id in session_ids}
+        for page in self.iter_messages(session_ids, columns=columns, page_size=page_size):
+            for row in page:
+                grouped.setdefault(row['session_id'], []).append(row)
+        return grouped
+
+    @metrics.timed()
     def update_session_timestamp(self, session_id: str) -> None:
         try:
             current_time = datetime.utcnow().isoformat()
-            self.supabase.table('chat_sessions').update({
-                'updated_at': current_time
-            }).eq('id', session_id).execute()
+            if self.write_queue:
+                self.write_queue.touch_session(session_id, current_time)
+            else:
+                self.backend.update_session_timestamps({session_id: current_time})
             logger.debug(f"세션 타임스탬프 갱신됨: {session_id}")
         except Exception as e:
             logger.error(f"세션 타임스탬프 갱신 실패: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+
+class _SourceBusy(Exception):
+    """소스의 동시 조회 한도를 넘어 조회를 시작하지 않았습니다."""
+
+
+@dataclass
+class ContextSource:
+    """
+    프롬프트에 들어갈 컨텍스트 하나를 가져오는 작업입니다.
+    fetch는 워커 스레드에서 실행되므로 Streamlit API(st.*)를 호출하면 안 됩니다.
+    """
+    name: str
+    fetch: Callable[[], Any]
+    deadline: float
+    fallback: Any = None
+    # 마지막으로 성공한 값을 보관할 키. None이면 보관하지 않습니다.
+    # 같은 키로 진행 중인 조회가 있으면 새로 조회하지 않고 그 결과를 함께 기다립니다.
+    cache_key: Optional[str] = None
+
+
+@dataclass
+class GatherResult:
+    values: Dict[str, Any] = field(default_factory=dict)
+    # 소스별 상태: ok, stale(마지막 값 사용), timeout, busy(진행 중인 조회가 많아 건너뜀), error
+    status: Dict[str, str] = field(default_factory=dict)
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+
+    def degraded(self) -> List[str]:
+        return [name for name, status in self.status.items() if status != "ok"]
+
+
+class ContextGatherer:
+    """
+    서로 독립적인 컨텍스트 조회를 스레드 풀에서 동시에 실행하고, 소스마다 마감 시간을 둡니다.
+    마감 안에 끝나지 않거나 실패한 소스는 마지막으로 성공한 값 또는 fallback 값을 사용하므로
+    느린 소스(예: Google Sheets) 때문에 LLM 호출이 늦어지지 않습니다.
+    마감 뒤에 끝난 조회 결과도 마지막 값으로 저장되어 다음 질문에 사용됩니다.
+    마감을 넘긴 조회는 취소할 수 없으므로, 소스마다 동시에 진행 중인 조회를 max_inflight_per_source개로 제한해
+    멈춘 소스 하나가 스레드 풀 전체를 차지하지 못하게 합니다.
+    """
+
+    def __init__(self, max_workers: int = 8, max_inflight_per_source: int = 2, max_cached_values: int = 1024):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="context")
+        self.max_inflight_per_source = max_inflight_per_source
+        self.max_cached_values = max_cached_values
+        self._last_known: "OrderedDict[str, Any]" = OrderedDict()
+        # 소스 이름별 진행 중인 조회 수와 cache_key별 진행 중인 조회
+        self._inflight: Dict[str, int] = {}
+        self._inflight_by_key: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _fallback(self, source: ContextSource):
+        if source.cache_key is not None:
+            with self._lock:
+                if source.cache_key in self._last_known:
+                    return self._last_known[source.cache_key], True
+        return source.fallback, False
+
+    def _submit(self, source: ContextSource, started: float) -> Optional[Future]:
+        """조회를 시작하거나 같은 키로 진행 중인 조회를 돌려줍니다. 소스의 동시 조회 한도를 넘으면 None입니다."""
+        with self._lock:
+            if source.cache_key is not None and source.cache_key in self._inflight_by_key:
+                return self._inflight_by_key[source.cache_key]
+            if self._inflight.get(source.name, 0) >= self.max_inflight_per_source:
+                return None
+            self._inflight[source.name] = self._inflight.get(source.name, 0) + 1
+            future = self._executor.submit(self._timed, source.fetch)
+            if source.cache_key is not None:
+                self._inflight_by_key[source.cache_key] = future
+        future.add_done_callback(lambda f, s=source: self._remember(s, started, f))
+        return future
+
+    def gather(self, sources: List[ContextSource]) -> GatherResult:
+        result = GatherResult()
+        started = time.perf_counter()
+        futures: Dict[str, Optional[Future]] = {}
+        for source in sources:
+            futures[source.name] = self._submit(source, started)
+
+        # 마감이 빠른 소스부터 기다립니다. 각 마감은 gather 시작 시점 기준입니다.
+        for source in sorted(sources, key=lambda s: s.deadline):
+            future = futures[source.name]
+            remaining = max(0.0, started + source.deadline - time.perf_counter())
+            try:
+                if future is None:
+                    raise _SourceBusy()
+                value, latency = future.result(timeout=remaining)
+                result.values[source.name] = value
+                result.status[source.name] = "ok"
+                result.latency_ms[source.name] = round(latency * 1000, 1)
+                continue
+            except _SourceBusy:
+                status = "busy"
+                logger.warning(f"컨텍스트 '{source.name}' 조회가 이미 {self.max_inflight_per_source}개 진행 중이라 건너뜀")
+            except FutureTimeoutError:
+                status = "timeout"
+                logger.warning(f"컨텍스트 '{source.name}' 조회가 {source.deadline:.1f}초 안에 끝나지 않음")
+            except Exception as e:
+                status = "error"
+                logger.error(f"컨텍스트 '{source.name}' 조회 실패: {str(e)}")
+            value, stale = self._fallback(source)
+            result.values[source.name] = value
+            result.status[source.name] = "stale" if stale else status
+            result.latency_ms[source.name] = round((time.perf_counter() - started) * 1000, 1)
+
+        result.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    @staticmethod
+    def _timed(fetch: Callable[[], Any]):
+        started = time.perf_counter()
+        value = fetch()
+        return value, time.perf_counter() - started
+
+    def _remember(self, source: ContextSource, started: float, future: Future) -> None:
+        with self._lock:
+            self._inflight[source.name] -= 1
+            if source.cache_key is not None and self._inflight_by_key.get(source.cache_key) is future:
+                del self._inflight_by_key[source.cache_key]
+        if future.cancelled() or future.exception() is not None or source.cache_key is None:
+            return
+        value, _ = future.result()
+        with self._lock:
+            self._last_known[source.cache_key] = value
+            self._last_known.move_to_end(source.cache_key)
+            while len(self._last_known) > self.max_cached_values:
+                self._last_known.popitem(last=False)
+        late_ms = (time.perf_counter() - started) * 1000
+        if late_ms > source.deadline * 1000:
+            logger.debug(f"컨텍스트 '{source.name}' 마감 후 완료 ({late_ms:.0f}ms), 다음 질문부터 사용")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
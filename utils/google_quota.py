@@ -0,0 +1,234 @@
+import random
+import socket
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional
+from googleapiclient.errors import HttpError
+from loguru import logger
+from utils.metrics import metrics
+
+# 재시도할 HTTP 상태 코드 (할당량 초과와 일시적인 서버 오류)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# 멱등이 아닌 요청(행 추가 등)도 재시도할 수 있는 상태 코드. 429는 서버가 요청을 처리하지 않고 거절한 것입니다.
+NON_IDEMPOTENT_RETRYABLE_STATUS = {429}
+
+
+class GoogleAPIUnavailable(Exception):
+    """회로 차단 중이거나 할당량 대기 시간이 너무 길어 요청을 보내지 않았습니다."""
+
+
+class TokenBucket:
+    """분당 요청 수(rate_per_minute)를 넘지 않도록 토큰을 나눠주는 스레드 안전 토큰 버킷입니다."""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute / 6)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        토큰 하나를 예약하고 기다려야 하는 시간(초)을 반환합니다.
+        max_wait보다 오래 기다려야 하면 예약하지 않고 None을 반환합니다.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return None
+            # 기다리는 동안 채워질 토큰까지 미리 가져가 뒤따르는 요청이 순서대로 기다리게 합니다.
+            self.tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold번 쌓이면 reset_timeout 동안 요청을 막습니다(open).
+    시간이 지나면 요청 하나만 시험 삼아 보내고(half-open), 성공하면 다시 엽니다(closed).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def cancel(self) -> None:
+        """허가받은 요청을 보내지 않았을 때 시험 요청 자리를 돌려줍니다."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """실패를 기록하고 이번 실패로 회로가 열렸으면 True를 반환합니다."""
+        with self._lock:
+            self.failures += 1
+            was_open = self.opened_at is not None
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+            return self.opened_at is not None and not was_open
+
+
+class QuotaGuard:
+    """
+    Google API 요청을 할당량 버킷(sheets_read, sheets_write, drive)별로 제한하고,
+    429/5xx는 지수 백오프(full jitter)로 재시도하며, 서비스(sheets, drive)별 회로 차단기를 둡니다.
+    5xx나 타임아웃은 서버가 요청을 이미 반영했을 수 있으므로, 멱등이 아닌 요청(idempotent=False)은 429만 재시도합니다.
+    읽기 결과는 마지막 정상 값으로 보관해 회로가 열려 있거나 요청이 실패하면 대신 돌려줍니다.
+    """
+
+    def __init__(self, rates_per_minute: Dict[str, float], max_retries: int = 4, base_delay: float = 0.5,
+                 max_delay: float = 16.0, max_wait: float = 10.0, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0):
+        self.buckets = {name: TokenBucket(rate) for name, rate in rates_per_minute.items()}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._last_good: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def service_of(bucket: str) -> str:
+        return bucket.split("_")[0]
+
+    def breaker(self, service: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(service)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[service] = breaker
+            return breaker
+
+    def _throttle(self, bucket: str) -> None:
+        limiter = self.buckets.get(bucket)
+        if limiter is None:
+            return
+        wait = limiter.reserve(self.max_wait)
+        if wait is None:
+            metrics.inc("google_api_rejected_total", bucket=bucket, reason="quota")
+            raise GoogleAPIUnavailable(f"{bucket} 할당량 대기 시간이 {self.max_wait:.0f}초를 넘습니다")
+        if wait > 0:
+            metrics.inc("google_api_throttled_total", bucket=bucket)
+            metrics.observe("google_api_throttle_seconds", wait, bucket=bucket)
+            time.sleep(wait)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        # 서버가 Retry-After를 알려주면 그보다 먼저 다시 보내지 않습니다.
+        resp = getattr(error, "resp", None)
+        retry_after = resp.get("retry-after") if resp is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(self.max_delay, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
+
+    @staticmethod
+    def _is_retryable(error: Exception, idempotent: bool = True) -> bool:
+        if isinstance(error, HttpError):
+            return error.resp.status in (RETRYABLE_STATUS if idempotent else NON_IDEMPOTENT_RETRYABLE_STATUS)
+        return idempotent and isinstance(error, (socket.timeout, ConnectionError, TimeoutError))
+
+    @staticmethod
+    def _is_service_failure(error: Exception) -> bool:
+        return QuotaGuard._is_retryable(error, idempotent=True)
+
+    def execute(self, request, bucket: str, idempotent: bool = True) -> Any:
+        """
+        googleapiclient 요청의 execute()를 할당량/재시도/회로 차단 정책에 따라 실행합니다.
+        재시도할 수 없는 오류(400, 404 등)와 재시도를 모두 소진한 오류는 그대로 다시 발생합니다.
+        idempotent=False인 요청(values.append, 시트 생성 등)은 중복 반영을 막기 위해 429만 재시도합니다.
+        """
+        service = self.service_of(bucket)
+        breaker = self.breaker(service)
+        if not breaker.allow():
+            metrics.inc("google_api_rejected_total", bucket=bucket, reason="circuit_open")
+            raise GoogleAPIUnavailable(f"{service} 회로 차단 중")
+
+        attempt = 0
+        while True:
+            try:
+                self._throttle(bucket)
+                result = request.execute()
+            except GoogleAPIUnavailable:
+                # 요청을 보내지 않았으므로 회로 상태는 바꾸지 않습니다.
+                breaker.cancel()
+                raise
+            except Exception as error:
+                if not self._is_service_failure(error):
+                    # 요청 자체의 오류이므로 서비스는 정상으로 봅니다.
+                    breaker.record_success()
+                    raise
+                if not self._is_retryable(error, idempotent) or attempt >= self.max_retries:
+                    if breaker.record_failure():
+                        metrics.inc("google_api_circuit_open_total", service=service)
+                        logger.warning(f"Google {service} 회로 차단 ({self.reset_timeout:.0f}초): {str(error)}")
+                    raise
+                delay = self._backoff(attempt, error)
+                status = error.resp.status if isinstance(error, HttpError) else type(error).__name__
+                metrics.inc("google_api_retries_total", bucket=bucket, status=status)
+                logger.debug(f"Google {bucket} 요청 재시도 {attempt + 1}/{self.max_retries} ({status}, {delay:.2f}초 후)")
+                time.sleep(delay)
+                attempt += 1
+            else:
+                breaker.record_success()
+                return result
+
+    def remember(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._last_good[key] = value
+
+    def last_good(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._last_good.get(key)
+        if value is None:
+            return default
+        metrics.inc("google_api_last_good_served_total", kind=str(key[0]))
+        return value
+
+    def stats(self) -> Dict[str, float]:
+        stats: Dict[str, float] = {"last_good_entries": len(self._last_good)}
+        for name, bucket in self.buckets.items():
+            stats[f"{name}_tokens"] = round(bucket.tokens, 2)
+        with self._lock:
+            breakers = dict(self._breakers)
+        for service, breaker in breakers.items():
+            stats[f"{service}_circuit_open"] = int(breaker.state != "closed")
+            stats[f"{service}_failures"] = breaker.failures
+        return stats
@@ -1,12 +1,23 @@
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from google.oauth2 import service_account
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+import httplib2
 import pandas as pd
 import logging
 from googleapiclient.discovery import build
 from googleapiclient.discovery_cache.base import Cache
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from config.settings import settings
+from utils.resources import registry
+from utils.metrics import metrics
+from utils.google_quota import GoogleAPIUnavailable, QuotaGuard
+from utils.sheet_frames import SheetFrameBridge
 
 logger = logging.getLogger(__name__)
 
@@ -19,51 +30,185 @@ class MemoryCache(Cache):
     def set(self, url, content):
         MemoryCache._CACHE[url] = content
 
+class MetadataCache:
+    """
+    스프레드시트 메타데이터를 (spreadsheet_id, fields) 단위로 TTL 동안 보관합니다.
+    """
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, spreadsheet_id: str, fields: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get((spreadsheet_id, fields))
+            if entry is None:
+                return None
+            expires_at, metadata = entry
+            if expires_at < time.monotonic():
+                del self._entries[(spreadsheet_id, fields)]
+                return None
+            return metadata
+
+    def set(self, spreadsheet_id: str, fields: str, metadata: Dict) -> None:
+        with self._lock:
+            self._entries[(spreadsheet_id, fields)] = (time.monotonic() + self.ttl, metadata)
+
+    def invalidate(self, spreadsheet_id: Optional[str] = None) -> None:
+        with self._lock:
+            if spreadsheet_id is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == spreadsheet_id]:
+                    del self._entries[key]
+
+def _load_credentials():
+    """
+    환경 변수의 서비스 계정 정보로 Credentials 객체를 생성합니다.
+    """
+    load_dotenv()
+    credentials_info = {
+        "type": os.getenv("type"),
+        "project_id": os.getenv("project_id"),
+        "private_key_id": os.getenv("private_key_id"),
+        "private_key": os.getenv("private_key").replace('\\n', '\n'),
+        "client_email": os.getenv("client_email"),
+        "client_id": os.getenv("client_id"),
+        "auth_uri": os.getenv("auth_uri"),
+        "token_uri": os.getenv("token_uri"),
+        "auth_provider_x509_cert_url": os.getenv("auth_provider_x509_cert_url"),
+        "client_x509_cert_url": os.getenv("client_x509_cert_url")
+    }
+    scopes = os.getenv("GOOGLE_SHEETS_SCOPES").split()
+    return service_account.Credentials.from_service_account_info(credentials_info, scopes=scopes)
+
+class SharedCredentials:
+    """
+    프로세스 전체에서 공유하는 서비스 계정 인증 정보입니다.
+    만료되었거나 곧 만료될 토큰은 잠금을 잡고 한 번만 갱신합니다.
+    """
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def ensure_valid(self) -> None:
+        if self.credentials.valid:
+            return
+        with self._lock:
+            if not self.credentials.valid:
+                self.credentials.refresh(Request())
+                logger.info("Google service account credentials refreshed")
+
+    def http(self) -> AuthorizedHttp:
+        # httplib2.Http는 스레드 안전하지 않으므로 스레드마다 연결을 따로 유지합니다.
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def build_request(self, http, *args, **kwargs) -> HttpRequest:
+        self.ensure_valid()
+        return HttpRequest(self.http(), *args, **kwargs)
+
+def get_shared_credentials() -> SharedCredentials:
+    return registry.get_or_create(('google', 'credentials'), lambda: SharedCredentials(_load_credentials()))
+
+def get_google_service(name: str, version: str):
+    """
+    Google API 서비스 객체를 프로세스당 한 번만 생성합니다.
+    """
+    def factory():
+        shared = get_shared_credentials()
+        return build(name, version,
+                     credentials=shared.credentials,
+                     cache=MemoryCache(),
+                     requestBuilder=shared.build_request)
+    return registry.get_or_create(('google', name, version), factory)
+
+def get_quota_guard() -> QuotaGuard:
+    """
+    프로세스 전체가 공유하는 Google API 할당량/재시도/회로 차단 정책입니다.
+    기본값은 서비스 계정(사용자 1명) 기준 Sheets 읽기/쓰기 분당 60회, Drive 분당 600회입니다.
+    """
+    def factory():
+        return QuotaGuard(
+            rates_per_minute={
+                'sheets_read': settings.GOOGLE_SHEETS_READS_PER_MINUTE,
+                'sheets_write': settings.GOOGLE_SHEETS_WRITES_PER_MINUTE,
+                'drive': settings.GOOGLE_DRIVE_REQUESTS_PER_MINUTE,
+            },
+            max_retries=settings.GOOGLE_API_MAX_RETRIES,
+            max_wait=settings.GOOGLE_API_MAX_QUOTA_WAIT,
+            failure_threshold=settings.GOOGLE_API_BREAKER_THRESHOLD,
+            reset_timeout=settings.GOOGLE_API_BREAKER_RESET
+        )
+    return registry.get_or_create(('google', 'quota'), factory)
+
 class GoogleAPIManager:
-    def __init__(self):
+    # 시트 목록 확인에 필요한 필드만 요청합니다.
+    METADATA_FIELDS = "spreadsheetId,properties.title,sheets.properties"
+    _metadata_cache = MetadataCache(ttl=settings.GOOGLE_SHEETS_METADATA_TTL)
+
+    def __init__(self, sheet_service=None):
+        if sheet_service is not None:
+            # 테스트/부하 측정용으로 주입된 시트 서비스를 사용합니다 (drive/forms 미사용).
+            self.SPREADSHEET_ID = None
+            self.SCOPES = []
+            self.credentials = None
+            self.sheet_service = sheet_service
+            return
         try:
             # 환경 변수 로드
             load_dotenv()
-            
-            # 서비스 계정 정보 설정
-            self.credentials_info = {
-                "type": os.getenv("type"),
-                "project_id": os.getenv("project_id"),
-                "private_key_id": os.getenv("private_key_id"),
-                "private_key": os.getenv("private_key").replace('\\n', '\n'),
-                "client_email": os.getenv("client_email"),
-                "client_id": os.getenv("client_id"),
-                "auth_uri": os.getenv("auth_uri"),
-                "token_uri": os.getenv("token_uri"),
-                "auth_provider_x509_cert_url": os.getenv("auth_provider_x509_cert_url"),
-                "client_x509_cert_url": os.getenv("client_x509_cert_url")
-            }
 
             # 스프레드시트 ID와 스코프 설정
             self.SPREADSHEET_ID = os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID")
             self.SCOPES = os.getenv("GOOGLE_SHEETS_SCOPES").split()
 
-            # Credentials 객체 생성
-            self.credentials = service_account.Credentials.from_service_account_info(
-                self.credentials_info, scopes=self.SCOPES)
-
-            # 서비스 객체 초기화 (메모리 캐시 사용)
-            self.sheet_service = build('sheets', 'v4', 
-                                     credentials=self.credentials,
-                                     cache=MemoryCache())
-            self.drive_service = build('drive', 'v3', 
-                                     credentials=self.credentials,
-                                     cache=MemoryCache())
-            self.forms_service = build('forms', 'v1', 
-                                     credentials=self.credentials,
-                                     cache=MemoryCache())
-            
+            # 공유 Credentials와 시트 서비스 (drive/forms는 처음 사용할 때 생성)
+            self.credentials = get_shared_credentials().credentials
+            self.sheet_service = get_google_service('sheets', 'v4')
+
         except Exception as err:
             logger.error(f"GoogleAPIManager initialization error: {err}")
+            self.credentials = None
             self.sheet_service = None
-            self.drive_service = None
-            self.forms_service = None
 
+    @property
+    def quota(self) -> QuotaGuard:
+        return get_quota_guard()
+
+    def execute(self, request, bucket: str = 'sheets_read', idempotent: bool = True):
+        """
+        요청을 할당량 제한, 429/5xx 재시도, 회로 차단을 거쳐 실행합니다.
+        drive_service/forms_service로 직접 만든 요청도 이 메서드로 실행합니다 (bucket='drive').
+        다시 보내면 중복 반영되는 요청은 idempotent=False로 실행해 429만 재시도합니다.
+        """
+        return self.quota.execute(request, bucket, idempotent)
+
+    @property
+    def frames(self) -> SheetFrameBridge:
+        """큰 시트를 청크 단위로 읽고 바뀐 셀만 쓰는 DataFrame 도구입니다 (인스턴스마다 스냅샷 보관)."""
+        bridge = getattr(self, '_frames', None)
+        if bridge is None:
+            bridge = self._frames = SheetFrameBridge(self)
+        return bridge
+
+    @property
+    def drive_service(self):
+        if self.credentials is None:
+            return None
+        return get_google_service('drive', 'v3')
+
+    @property
+    def forms_service(self):
+        if self.credentials is None:
+            return None
+        return get_google_service('forms', 'v1')
+
+    @metrics.timed()
     def create_spreadsheet(self, title: str) -> Optional[str]:
         """
         새로운 스프레드시트를 생성합니다.
@@ -74,134 +219,248 @@ class GoogleAPIManager:
                     'title': title
                 }
             }
-            spreadsheet = self.sheet_service.spreadsheets().create(
+            spreadsheet = self.execute(self.sheet_service.spreadsheets().create(
                 body=spreadsheet,
                 fields='spreadsheetId'
-            ).execute()
+            ), 'sheets_write', idempotent=False)
             return spreadsheet.get('spreadsheetId')
-        except HttpError as error:
+        except (HttpError, GoogleAPIUnavailable) as error:
             logging.error(f"Failed to create spreadsheet: {error}")
             return None
 
-    def get_spreadsheet_metadata(self, spreadsheet_id: str) -> Optional[Dict]:
+    @metrics.timed()
+    def get_spreadsheet_metadata(self, spreadsheet_id: str, fields: Optional[str] = None,
+                                 use_cache: bool = True) -> Optional[Dict]:
         """
         스프레드시트의 메타데이터를 가져옵니다.
+        fields를 지정하지 않으면 METADATA_FIELDS만 요청하며, 결과는 TTL 동안 캐시됩니다.
+        요청이 실패하면 마지막으로 성공한 메타데이터를 반환합니다.
         """
+        fields = fields or self.METADATA_FIELDS
+        if use_cache:
+            cached = self._metadata_cache.get(spreadsheet_id, fields)
+            if cached is not None:
+                return cached
+        key = ('metadata', spreadsheet_id, fields)
         try:
-            return self.sheet_service.spreadsheets().get(
-                spreadsheetId=spreadsheet_id
-            ).execute()
-        except HttpError as error:
+            metadata = self.execute(self.sheet_service.spreadsheets().get(
+                spreadsheetId=spreadsheet_id,
+                fields=fields
+            ), 'sheets_read')
+            self._metadata_cache.set(spreadsheet_id, fields, metadata)
+            self.quota.remember(key, metadata)
+            return metadata
+        except (HttpError, GoogleAPIUnavailable) as error:
             logging.error(f"Failed to get spreadsheet metadata: {error}")
-            return None
+            return self.quota.last_good(key)
 
-    def read_sheet_data(self, spreadsheet_id: str, range_name: str) -> List[List]:
+    def invalidate_metadata(self, spreadsheet_id: Optional[str] = None) -> None:
+        """
+        메타데이터 캐시를 비웁니다. spreadsheet_id가 없으면 전체를 비웁니다.
+        """
+        self._metadata_cache.invalidate(spreadsheet_id)
+
+    @staticmethod
+    def _normalize_range(range_name: str) -> str:
+        # range_name이 시트 이름만 포함하는 경우 전체 범위를 읽음
+        if '!' not in range_name and not range_name.startswith("'"):
+            return f"'{range_name}'"
+        return range_name
+
+    @metrics.timed()
+    def read_sheet_data(self, spreadsheet_id: str, range_name: str, strict: bool = False) -> List[List]:
         """
         지정된 스프레드시트의 범위에서 데이터를 읽어옵니다.
         range_name 형식: 'Sheet1' 또는 'Sheet1!A1:D10' 또는 'A1:D10'
+        요청이 실패하면 마지막으로 성공한 값을 반환합니다.
+        strict가 True이면 대신 오류를 그대로 발생시킵니다 (오래된 값을 새 값으로 착각하면 안 될 때).
         """
+        key = ('values', spreadsheet_id, range_name)
         try:
-            # 시트 메타데이터 확인
+            # 시트 메타데이터 확인 (캐시 사용)
             metadata = self.get_spreadsheet_metadata(spreadsheet_id)
             if not metadata:
                 logging.error("Failed to get spreadsheet metadata")
+                if strict:
+                    raise GoogleAPIUnavailable("스프레드시트 메타데이터를 가져오지 못했습니다")
                 return []
 
-            # range_name이 시트 이름만 포함하는 경우 전체 범위를 읽음
-            if '!' not in range_name:
-                range_name = f"'{range_name}'"
-
-            result = self.sheet_service.spreadsheets().values().get(
+            result = self.execute(self.sheet_service.spreadsheets().values().get(
                 spreadsheetId=spreadsheet_id,
-                range=range_name
-            ).execute()
-            return result.get('values', [])
-        except HttpError as error:
+                range=self._normalize_range(range_name)
+            ), 'sheets_read')
+            values = result.get('values', [])
+            self.quota.remember(key, values)
+            return values
+        except (HttpError, GoogleAPIUnavailable) as error:
             logging.error(f"Failed to read sheet data: {error}")
-            return []
+            if strict:
+                raise
+            return self.quota.last_good(key, [])
 
+    @metrics.timed()
+    def read_ranges(self, spreadsheet_id: str, ranges: List[str], strict: bool = False) -> Dict[str, List[List]]:
+        """
+        여러 범위를 values().batchGet 한 번으로 읽어옵니다.
+        요청한 range 이름을 키로, 각 범위의 값을 값으로 하는 딕셔너리를 반환합니다.
+        요청이 실패하면 범위마다 마지막으로 성공한 값을 반환합니다.
+        strict가 True이면 대신 오류를 그대로 발생시킵니다 (빈 값과 실패를 구분해야 할 때).
+        """
+        if not ranges:
+            return {}
+        try:
+            result = self.execute(self.sheet_service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=[self._normalize_range(r) for r in ranges]
+            ), 'sheets_read')
+            value_ranges = result.get('valueRanges', [])
+            # batchGet은 요청 순서대로 결과를 돌려줍니다.
+            batched = {
+                range_name: (value_ranges[i].get('values', []) if i < len(value_ranges) else [])
+                for i, range_name in enumerate(ranges)
+            }
+            for range_name, values in batched.items():
+                self.quota.remember(('values', spreadsheet_id, range_name), values)
+            return batched
+        except (HttpError, GoogleAPIUnavailable) as error:
+            logging.error(f"Failed to batch read sheet data: {error}")
+            if strict:
+                raise
+            return {
+                range_name: self.quota.last_good(('values', spreadsheet_id, range_name), [])
+                for range_name in ranges
+            }
+
+    @metrics.timed()
     def write_sheet_data(self, spreadsheet_id: str, range_name: str, values: List[List]) -> bool:
         """
         지정된 스프레드시트의 범위에 데이터를 씁니다.
         """
         try:
             body = {'values': values}
-            self.sheet_service.spreadsheets().values().update(
+            self.execute(self.sheet_service.spreadsheets().values().update(
                 spreadsheetId=spreadsheet_id,
                 range=range_name,
                 valueInputOption='RAW',
                 body=body
-            ).execute()
+            ), 'sheets_write')
             return True
-        except HttpError as error:
+        except (HttpError, GoogleAPIUnavailable) as error:
             logging.error(f"Failed to write sheet data: {error}")
             return False
 
+    @metrics.timed()
+    def write_ranges(self, spreadsheet_id: str, data: Dict[str, List[List]]) -> bool:
+        """
+        여러 범위를 values().batchUpdate 한 번으로 씁니다.
+        data는 range 이름을 키로, 쓸 값을 값으로 하는 딕셔너리입니다.
+        """
+        if not data:
+            return True
+        try:
+            body = {
+                'valueInputOption': 'RAW',
+                'data': [{'range': range_name, 'values': values} for range_name, values in data.items()]
+            }
+            self.execute(self.sheet_service.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body=body
+            ), 'sheets_write')
+            return True
+        except (HttpError, GoogleAPIUnavailable) as error:
+            logging.error(f"Failed to batch write sheet data: {error}")
+            return False
+
+    @metrics.timed()
     def append_sheet_data(self, spreadsheet_id: str, range_name: str, values: List[List]) -> bool:
         """
         지정된 스프레드시트의 마지막 행에 데이터를 추가합니다.
         """
         try:
             body = {'values': values}
-            self.sheet_service.spreadsheets().values().append(
+            self.execute(self.sheet_service.spreadsheets().values().append(
                 spreadsheetId=spreadsheet_id,
                 range=range_name,
                 valueInputOption='RAW',
                 insertDataOption='INSERT_ROWS',
                 body=body
-            ).execute()
+            ), 'sheets_write', idempotent=False)
             return True
-        except HttpError as error:
+        except (HttpError, GoogleAPIUnavailable) as error:
             logging.error(f"Failed to append sheet data: {error}")
             return False
 
+    @metrics.timed()
     def batch_update_sheet(self, spreadsheet_id: str, requests: List[Dict]) -> bool:
         """
         여러 업데이트를 한 번에 실행합니다.
         """
         try:
             body = {'requests': requests}
-            self.sheet_service.spreadsheets().batchUpdate(
+            # 행/시트 추가처럼 다시 보내면 중복되는 요청이 섞일 수 있습니다.
+            self.execute(self.sheet_service.spreadsheets().batchUpdate(
                 spreadsheetId=spreadsheet_id,
                 body=body
-            ).execute()
+            ), 'sheets_write', idempotent=False)
+            # 시트 추가/삭제 등 구조가 바뀌었을 수 있으므로 메타데이터 캐시를 비웁니다.
+            self.invalidate_metadata(spreadsheet_id)
             return True
-        except HttpError as error:
+        except (HttpError, GoogleAPIUnavailable) as error:
             logging.error(f"Failed to batch update sheet: {error}")
             return False
 
+    @metrics.timed()
     def clear_sheet_range(self, spreadsheet_id: str, range_name: str) -> bool:
         """
         지정된 스프레드시트의 범위의 데이터를 지웁니다.
         """
         try:
-            self.sheet_service.spreadsheets().values().clear(
+            self.execute(self.sheet_service.spreadsheets().values().clear(
                 spreadsheetId=spreadsheet_id,
                 range=range_name
-            ).execute()
+            ), 'sheets_write')
             return True
-        except HttpError as error:
+        except (HttpError, GoogleAPIUnavailable) as error:
             logging.error(f"Failed to clear sheet range: {error}")
             return False
 
-    def get_sheet_as_dataframe(self, spreadsheet_id: str, range_name: str) -> pd.DataFrame:
+    def get_sheet_as_dataframe(self, spreadsheet_id: str, range_name: str,
+                               data: Optional[List[List]] = None) -> pd.DataFrame:
         """
         스프레드시트 데이터를 pandas DataFrame으로 변환합니다.
+        read_ranges로 이미 읽어 둔 값이 있으면 data로 넘겨 추가 호출 없이 변환합니다.
+        값은 모두 문자열이며, 큰 시트나 타입이 필요한 경우 frames.read_frame을 사용합니다.
         """
         try:
-            data = self.read_sheet_data(spreadsheet_id, range_name)
-            if not data:
-                return pd.DataFrame()
-            
-            headers = data[0]
-            values = data[1:]
-            return pd.DataFrame(values, columns=headers)
+            if data is None:
+                data = self.read_sheet_data(spreadsheet_id, range_name)
+            return self.values_to_dataframe(data)
         except Exception as error:
             logging.error(f"Failed to convert sheet to DataFrame: {error}")
             return pd.DataFrame()
+
+    def get_sheets_as_dataframes(self, spreadsheet_id: str, ranges: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        여러 범위를 한 번에 읽어 범위별 DataFrame으로 변환합니다.
+        """
+        batched = self.read_ranges(spreadsheet_id, ranges)
+        return {
+            range_name: self.get_sheet_as_dataframe(spreadsheet_id, range_name, data=values)
+            for range_name, values in batched.items()
+        }
+
+    @staticmethod
+    def values_to_dataframe(data: List[List]) -> pd.DataFrame:
+        if not data:
+            return pd.DataFrame()
+        headers = data[0]
+        values = data[1:]
+        return pd.DataFrame(values, columns=headers)
+
     def dataframe_to_sheet(self, spreadsheet_id: str, range_name: str, df: pd.DataFrame) -> bool:
         """
         DataFrame을 스프레드시트에 씁니다.
+        한 번의 update로 전체를 쓰므로, 큰 시트는 나눠 쓰고 바뀐 셀만 쓰는 frames.write_frame을 사용합니다.
         """
         try:
             values = [df.columns.values.tolist()] + df.values.tolist()
@@ -1,60 +1,327 @@
-import requests
+import asyncio
 import base64
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+import httpx
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from utils.metrics import metrics
+from utils.resources import registry
+
+KAKAOPAY_BASE_URL = "https://kapi.kakao.com"
+TOKEN_PATH = "/v1/payment/oauth/token"
+
+
+def make_session(pool_maxsize: int = 10) -> requests.Session:
+    """연결을 재사용하는 requests.Session을 만듭니다 (TLS 연결을 매 요청마다 새로 맺지 않음)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 class KakaoPayAuth:
-    def __init__(self, client_id, client_secret, redirect_uri):
+    def __init__(self, client_id, client_secret, redirect_uri, session: Optional[requests.Session] = None,
+                 base_url: str = KAKAOPAY_BASE_URL, timeout: float = 10.0):
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
-        # 수정된 토큰 URL - 카카오페이 OAuth 서버 주소
-        self.token_url = "https://kapi.kakao.com/v1/payment/oauth/token"
-        
+        # 수정된 토큰 URL - 카카오페이 OAuth 서버 주소 (테스트에서는 base_url로 mock 서버를 가리킴)
+        self.token_url = f"{base_url}{TOKEN_PATH}"
+        self.session = session or make_session()
+        self.timeout = timeout
+
         # Basic 인증을 위한 인코딩된 credentials 생성
         credentials = f"{self.client_id}:{self.client_secret}"
         self.encoded_credentials = base64.b64encode(credentials.encode()).decode()
-    
-    def get_access_token(self, authorization_code):
-        headers = {
+
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Content-Type": "application/x-www-form-urlencoded",
             "Authorization": f"Basic {self.encoded_credentials}"
         }
-        
-        data = {
-            "grant_type": "authorization_code",
-            "code": authorization_code,
-            "redirect_uri": self.redirect_uri
-        }
-        
+
+    def _post(self, data: Dict[str, str], action: str) -> Dict:
         try:
-            response = requests.post(self.token_url, headers=headers, data=data)
+            response = self.session.post(self.token_url, headers=self._headers(), data=data, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
-            print(f"요청 상세 정보: URL={self.token_url}, Headers={headers}, Data={data}")
-            if hasattr(e.response, 'status_code') and hasattr(e.response, 'text'):
-                print(f"응답 상세 정보: Status={e.response.status_code}, Content={e.response.text}")
-            raise Exception(f"토큰 발급 실패: {str(e)}")
-    
+            # 인증 헤더와 코드/토큰 값은 로그에 남기지 않습니다.
+            detail = ""
+            if getattr(e, 'response', None) is not None:
+                detail = f" (Status={e.response.status_code}, Content={e.response.text[:200]})"
+            logger.error(f"카카오페이 {action} 실패: URL={self.token_url}, grant_type={data['grant_type']}{detail}")
+            raise Exception(f"{action} 실패: {str(e)}")
+
+    @metrics.timed()
+    def get_access_token(self, authorization_code):
+        return self._post({
+            "grant_type": "authorization_code",
+            "code": authorization_code,
+            "redirect_uri": self.redirect_uri
+        }, "토큰 발급")
+
+    @metrics.timed()
     def refresh_access_token(self, refresh_token):
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": f"Basic {self.encoded_credentials}"
-        }
-        
-        data = {
+        return self._post({
             "grant_type": "refresh_token",
             "refresh_token": refresh_token
-        }
-        
+        }, "토큰 갱신")
+
+
+@dataclass
+class KakaoPayToken:
+    access_token: str
+    refresh_token: Optional[str]
+    expires_at: float
+    refresh_token_expires_at: Optional[float] = None
+
+    @classmethod
+    def from_response(cls, token_info: Dict, previous: Optional["KakaoPayToken"] = None) -> "KakaoPayToken":
+        now = time.time()
+        # 갱신 응답에 refresh_token이 없으면 기존 refresh_token을 계속 사용합니다.
+        refresh_token = token_info.get("refresh_token") or (previous.refresh_token if previous else None)
+        refresh_expires_in = token_info.get("refresh_token_expires_in")
+        return cls(
+            access_token=token_info["access_token"],
+            refresh_token=refresh_token,
+            expires_at=now + float(token_info.get("expires_in", 0)),
+            refresh_token_expires_at=(
+                now + float(refresh_expires_in) if refresh_expires_in
+                else (previous.refresh_token_expires_at if previous else None)
+            )
+        )
+
+    def expires_in(self) -> float:
+        return self.expires_at - time.time()
+
+
+class TokenStore:
+    """토큰을 메모리에 두고, path가 있으면 로컬 파일(권한 600)에도 저장해 재시작 후에도 사용합니다."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._token: Optional[KakaoPayToken] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
         try:
-            response = requests.post(self.token_url, headers=headers, data=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"요청 상세 정보: URL={self.token_url}, Headers={headers}, Data={data}")
-            if hasattr(e.response, 'status_code') and hasattr(e.response, 'text'):
-                print(f"응답 상세 정보: Status={e.response.status_code}, Content={e.response.text}")
-            raise Exception(f"토큰 갱신 실패: {str(e)}")
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self._token = KakaoPayToken(**json.load(file))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"카카오페이 토큰 파일을 읽지 못했습니다: {str(e)}")
+
+    def get(self) -> Optional[KakaoPayToken]:
+        with self._lock:
+            return self._token
+
+    def set(self, token: KakaoPayToken) -> None:
+        with self._lock:
+            self._token = token
+            if not self.path:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(asdict(token), file)
+            os.replace(tmp_path, self.path)
+
+
+class KakaoPayClient:
+    """
+    토큰을 캐시하고 만료 refresh_margin초 전에 백그라운드에서 미리 갱신하는 카카오페이 클라이언트입니다.
+    - 연결은 KakaoPayAuth의 Session을 공유해 재사용합니다.
+    - 여러 세션이 동시에 토큰을 요청해도 갱신 요청은 한 번만 보냅니다(single-flight).
+    - 백그라운드 갱신은 시도 사이에 최소 retry_interval초를 두고, refresh_token이 없거나 만료되면
+      새 토큰이 저장(exchange_code)될 때까지 기다립니다.
+    """
+
+    def __init__(self, auth: KakaoPayAuth, store: Optional[TokenStore] = None, refresh_margin: float = 300.0,
+                 retry_interval: float = 30.0, background: bool = True):
+        self.auth = auth
+        self.store = store or TokenStore()
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self._thread: Optional[threading.Thread] = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="kakaopay-token-refresh", daemon=True)
+            self._thread.start()
+
+    def exchange_code(self, authorization_code: str) -> KakaoPayToken:
+        """인가 코드로 토큰을 발급받아 저장합니다."""
+        token = KakaoPayToken.from_response(self.auth.get_access_token(authorization_code))
+        self.store.set(token)
+        self._wakeup.set()
+        return token
+
+    def _needs_refresh(self, token: Optional[KakaoPayToken]) -> bool:
+        return token is not None and token.expires_in() <= self.refresh_margin
+
+    @staticmethod
+    def _can_refresh(token: Optional[KakaoPayToken]) -> bool:
+        if token is None or not token.refresh_token:
+            return False
+        return token.refresh_token_expires_at is None or token.refresh_token_expires_at > time.time()
+
+    def refresh(self, force: bool = False) -> Optional[KakaoPayToken]:
+        """
+        토큰을 갱신합니다. 다른 스레드가 이미 갱신 중이면 그 결과를 기다려 사용합니다.
+        force가 아니면 잠금을 얻은 뒤 다시 확인해 이미 갱신된 토큰은 그대로 반환합니다.
+        """
+        with self._refresh_lock:
+            token = self.store.get()
+            if token is None or not token.refresh_token:
+                return token
+            if not force and not self._needs_refresh(token):
+                return token
+            try:
+                token = KakaoPayToken.from_response(self.auth.refresh_access_token(token.refresh_token), token)
+            except Exception:
+                self.refresh_failures += 1
+                metrics.inc("kakaopay_token_refresh_failures_total")
+                raise
+            self.store.set(token)
+            self.refreshes += 1
+            metrics.inc("kakaopay_token_refreshes_total")
+            logger.info(f"카카오페이 토큰 갱신됨 (만료까지 {token.expires_in():.0f}초)")
+            return token
+
+    def access_token(self) -> Optional[str]:
+        """유효한 액세스 토큰을 반환합니다. 만료가 가까우면 갱신한 뒤 반환하며, 토큰이 없으면 None입니다."""
+        token = self.store.get()
+        if self._needs_refresh(token):
+            try:
+                token = self.refresh()
+            except Exception:
+                # 아직 만료되지 않았으면 기존 토큰을 사용하고 백그라운드 갱신에 맡깁니다.
+                if token.expires_in() <= 0:
+                    raise
+        return token.access_token if token else None
+
+    def _sleep(self, seconds: Optional[float]) -> None:
+        """seconds초(None이면 깨울 때까지) 기다립니다. exchange_code와 close가 깨웁니다."""
+        self._wakeup.wait(seconds)
+        self._wakeup.clear()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            token = self.store.get()
+            if not self._can_refresh(token):
+                # 갱신할 수 없는 토큰이면 새 토큰이 들어올 때까지 기다립니다.
+                self._sleep(None)
+                continue
+            wait = token.expires_in() - self.refresh_margin
+            if wait > 0:
+                self._sleep(wait)
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"카카오페이 토큰 백그라운드 갱신 실패, {self.retry_interval:.0f}초 후 재시도: {str(e)}")
+            # 갱신 직후에도 만료가 가까운 토큰(유효 기간이 refresh_margin보다 짧음)이나 실패한 경우
+            # 곧바로 다시 요청하지 않도록 최소 retry_interval을 기다립니다.
+            self._sleep(self.retry_interval)
+
+    def close(self) -> None:
+        """백그라운드 갱신 스레드를 멈춥니다."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def stats(self) -> Dict[str, float]:
+        token = self.store.get()
+        return {
+            "has_token": int(token is not None),
+            "expires_in": round(token.expires_in(), 1) if token else -1,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+class AsyncKakaoPayClient:
+    """
+    httpx.AsyncClient를 사용하는 비동기 버전입니다. 토큰 저장소는 동기 클라이언트와 같은 TokenStore를 쓸 수 있습니다.
+    같은 이벤트 루프 안에서 동시에 갱신을 요청해도 토큰 엔드포인트에는 한 번만 요청합니다.
+    """
+
+    def __init__(self, client_id, client_secret, redirect_uri, store: Optional[TokenStore] = None,
+                 http_client: Optional[httpx.AsyncClient] = None, base_url: str = KAKAOPAY_BASE_URL,
+                 refresh_margin: float = 300.0, timeout: float = 10.0):
+        self.redirect_uri = redirect_uri
+        self.token_url = f"{base_url}{TOKEN_PATH}"
+        self.store = store or TokenStore()
+        self.refresh_margin = refresh_margin
+        self.http_client = http_client or httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=10))
+        credentials = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
+        self._headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Authorization": f"Basic {credentials}"
+        }
+        self._refresh_lock = asyncio.Lock()
+
+    async def _post(self, data: Dict[str, str]) -> Dict:
+        response = await self.http_client.post(self.token_url, headers=self._headers, data=data)
+        response.raise_for_status()
+        return response.json()
+
+    async def exchange_code(self, authorization_code: str) -> KakaoPayToken:
+        token = KakaoPayToken.from_response(await self._post({
+            "grant_type": "authorization_code",
+            "code": authorization_code,
+            "redirect_uri": self.redirect_uri
+        }))
+        self.store.set(token)
+        return token
+
+    async def refresh(self, force: bool = False) -> Optional[KakaoPayToken]:
+        async with self._refresh_lock:
+            token = self.store.get()
+            if token is None or not token.refresh_token:
+                return token
+            if not force and token.expires_in() > self.refresh_margin:
+                return token
+            token = KakaoPayToken.from_response(
+                await self._post({"grant_type": "refresh_token", "refresh_token": token.refresh_token}), token
+            )
+            self.store.set(token)
+            metrics.inc("kakaopay_token_refreshes_total")
+            return token
+
+    async def access_token(self) -> Optional[str]:
+        token = self.store.get()
+        if token is not None and token.expires_in() <= self.refresh_margin:
+            token = await self.refresh()
+        return token.access_token if token else None
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
+
+
+def get_kakaopay_client(client_id, client_secret, redirect_uri, token_path: Optional[str] = None) -> KakaoPayClient:
+    """프로세스 전체가 공유하는 카카오페이 클라이언트 (연결 풀, 토큰 캐시, 백그라운드 갱신)를 반환합니다."""
+    return registry.get_or_create(
+        ('kakaopay', client_id),
+        lambda: KakaoPayClient(KakaoPayAuth(client_id, client_secret, redirect_uri), TokenStore(token_path))
+    )
 
 def get_authorization_url(client_id, redirect_uri):
     """
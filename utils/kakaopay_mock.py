@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs
+from loguru import logger
+from utils.kakaopay import TOKEN_PATH
+
+
+class MockKakaoPayServer:
+    """
+    카카오페이 토큰 엔드포인트를 흉내 내는 로컬 HTTP 서버입니다 (외부 호출 없는 테스트/부하 측정용).
+    KakaoPayAuth/AsyncKakaoPayClient의 base_url에 base_url을 넘겨 사용합니다.
+
+        server = MockKakaoPayServer(expires_in=2).start()
+        auth = KakaoPayAuth("id", "secret", "http://localhost", base_url=server.base_url)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, expires_in: int = 7199,
+                 latency: float = 0.0):
+        self.expires_in = expires_in
+        self.latency = latency
+        self.requests: Dict[str, int] = {"authorization_code": 0, "refresh_token": 0}
+        self._refresh_tokens = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _issue(self) -> Dict:
+        refresh_token = uuid.uuid4().hex
+        with self._lock:
+            self._refresh_tokens.add(refresh_token)
+        return {
+            "access_token": uuid.uuid4().hex,
+            "token_type": "bearer",
+            "refresh_token": refresh_token,
+            "expires_in": self.expires_in,
+            "refresh_token_expires_in": self.expires_in * 10,
+        }
+
+    def _token(self, form: Dict[str, str]):
+        grant_type = form.get("grant_type", "")
+        with self._lock:
+            if grant_type in self.requests:
+                self.requests[grant_type] += 1
+        if grant_type == "authorization_code" and form.get("code"):
+            return 200, self._issue()
+        if grant_type == "refresh_token":
+            with self._lock:
+                known = form.get("refresh_token") in self._refresh_tokens
+            if known:
+                return 200, self._issue()
+        return 401, {"error": "invalid_grant"}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != TOKEN_PATH:
+                    self.send_error(404)
+                    return
+                if not self.headers.get("Authorization", "").startswith("Basic "):
+                    status, payload = 401, {"error": "invalid_client"}
+                else:
+                    length = int(self.headers.get("Content-Length", 0))
+                    form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+                    if mock.latency:
+                        time.sleep(mock.latency)
+                    status, payload = mock._token(form)
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockKakaoPayServer":
+        threading.Thread(target=self._server.serve_forever, name="kakaopay-mock", daemon=True).start()
+        logger.info(f"카카오페이 mock 서버 시작: {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
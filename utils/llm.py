@@ -1,39 +1,166 @@
 import streamlit as st
+import threading
 from datetime import datetime
+import httpx
 import openai
+from cachetools import TTLCache
 from loguru import logger
 from config.settings import settings
 from langchain_openai import ChatOpenAI
 from langchain_community.chat_models import ChatOllama
 from anthropic import Anthropic
+from utils.resources import registry, fingerprint
+from utils.llm_router import LLMRouter
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY
+    )
+
+def get_http_client() -> httpx.Client:
+    """
+    모든 OpenAI 클라이언트가 함께 쓰는 keep-alive 연결 풀입니다.
+    재실행/세션마다 TLS 연결을 새로 맺지 않도록 프로세스당 하나만 생성합니다.
+    """
+    return registry.get_or_create('llm_http_client', lambda: httpx.Client(
+        limits=_http_limits(), timeout=settings.LLM_HTTP_TIMEOUT
+    ))
+
+def get_async_http_client() -> httpx.AsyncClient:
+    return registry.get_or_create('llm_async_http_client', lambda: httpx.AsyncClient(
+        limits=_http_limits(), timeout=settings.LLM_HTTP_TIMEOUT
+    ))
+
+# 사용자가 입력한 API 키로 만든 클라이언트. 키가 계속 바뀌어도 쌓이지 않도록 개수와 유지 시간을 제한합니다.
+# 연결 풀은 공유하므로 만료된 클라이언트를 버려도 연결이 새지 않습니다.
+_user_clients = TTLCache(maxsize=settings.USER_CLIENT_CACHE_SIZE, ttl=settings.USER_CLIENT_CACHE_TTL)
+_user_clients_lock = threading.Lock()
+
+def _get_or_create_client(key, api_key: str, factory):
+    """서버 API 키의 클라이언트는 프로세스당 하나, 사용자 API 키의 클라이언트는 TTL 캐시에 보관합니다."""
+    if api_key == settings.OPENAI_API_KEY.get_secret_value():
+        return registry.get_or_create(key, factory)
+    with _user_clients_lock:
+        client = _user_clients.get(key)
+        if client is None:
+            client = factory()
+            _user_clients[key] = client
+        return client
+
+def get_openai_client(api_key: str) -> openai.OpenAI:
+    return _get_or_create_client(
+        ('openai_client', fingerprint(api_key)), api_key,
+        lambda: openai.OpenAI(api_key=api_key, http_client=get_http_client())
+    )
+
+# API 키 해시 -> 모델 목록. 조회에 실패한 결과는 보관하지 않습니다.
+_model_catalog = TTLCache(maxsize=64, ttl=settings.MODEL_CATALOG_TTL)
+_model_catalog_lock = threading.Lock()
+
+def fetch_openai_model_list(api_key):
+    key = fingerprint(api_key)
+    with _model_catalog_lock:
+        models = _model_catalog.get(key)
+    if models is not None:
+        return models
+    models = get_openai_client(api_key).models.list()
+    gpt_models = [{"id": m.id, "created": datetime.fromtimestamp(m.created)} 
+                 for m in models if m.id.startswith("gpt")]
+    models = sorted(gpt_models, key=lambda x: x["created"], reverse=True)
+    with _model_catalog_lock:
+        _model_catalog[key] = models
+    logger.info(f"OpenAI 모델 목록 조회됨 ({len(models)}개)")
+    return models
 
 def get_openai_model_list(api_key):
     try:
-        client = openai.OpenAI(api_key=api_key)
-        models = client.models.list()
-        gpt_models = [{"id": m.id, "created": datetime.fromtimestamp(m.created)} 
-                     for m in models if m.id.startswith("gpt")]
-        return sorted(gpt_models, key=lambda x: x["created"], reverse=True)
+        return fetch_openai_model_list(api_key)
     except Exception as e:
         logger.error(f"OpenAI 모델 목록 조회 중 오류 발생: {str(e)}")
         st.error("모델 목록을 가져오는 중 오류가 발생했습니다.")
         st.stop()
 
-def configure_llm():
+def get_chat_openai(model: str, api_key: str) -> ChatOpenAI:
+    """(모델, API 키)마다 ChatOpenAI 인스턴스를 한 번만 생성해 재사용하고, 공유 연결 풀을 사용합니다."""
+    return _get_or_create_client(
+        ('openai', model, fingerprint(api_key)), api_key,
+        # stream_usage: 스트리밍 응답에서도 사용량(캐시된 토큰 포함)을 받아옵니다.
+        lambda: ChatOpenAI(
+            model_name=model, temperature=0, streaming=True, stream_usage=True, api_key=api_key,
+            http_client=get_http_client(), http_async_client=get_async_http_client()
+        )
+    )
+
+def get_chat_ollama(model: str) -> ChatOllama:
+    # ChatOllama는 HTTP 클라이언트를 주입받지 않으므로 (모델, 엔드포인트)별 인스턴스 재사용만 합니다.
+    return registry.get_or_create(
+        ('ollama', model, settings.OLLAMA_ENDPOINT),
+        lambda: ChatOllama(model=model, base_url=settings.OLLAMA_ENDPOINT)
+    )
+
+def get_token_counter_llm() -> ChatOpenAI:
+    """선택된 모델과 관계없이 tiktoken 기반으로 토큰을 세기 위한 기본 OpenAI 모델입니다."""
+    return get_chat_openai(settings.DEFAULT_MODEL, settings.OPENAI_API_KEY.get_secret_value())
+
+def extract_usage(message) -> dict:
+    """
+    응답 메시지의 사용량 정보에서 입력/출력/캐시된 입력 토큰 수를 꺼냅니다.
+    공급자가 사용량을 주지 않으면 0으로 채웁니다.
+    """
+    usage = getattr(message, 'usage_metadata', None) or {}
+    input_details = usage.get('input_token_details') or {}
+    return {
+        "input_tokens": usage.get('input_tokens', 0),
+        "output_tokens": usage.get('output_tokens', 0),
+        "cached_tokens": input_details.get('cache_read', 0) or 0,
+    }
+
+def make_router(backends, default_backend, simple_backend=None) -> LLMRouter:
+    return LLMRouter(
+        backends,
+        default_backend=default_backend,
+        simple_backend=simple_backend,
+        simple_max_chars=settings.ROUTER_SIMPLE_MAX_CHARS,
+        hedge=settings.ROUTER_HEDGE_ENABLED,
+        hedge_min_delay=settings.ROUTER_HEDGE_MIN_DELAY,
+        hedge_max_delay=settings.ROUTER_HEDGE_MAX_DELAY,
+        max_error_rate=settings.ROUTER_MAX_ERROR_RATE,
+        error_cooldown=settings.ROUTER_ERROR_COOLDOWN,
+        total_timeout=settings.ROUTER_TOTAL_TIMEOUT
+    )
+
+def configure_llm() -> LLMRouter:
+    """
+    선택된 LLM을 라우터로 감싸 반환합니다.
+    '자동 선택'(ROUTER_AUTO_ENABLED일 때만 표시)은 단순한 질문을 로컬 llama3로, 나머지를 기본 OpenAI 모델로 보내고
+    서로를 예비로 사용합니다. 모델을 직접 고르면 해당 백엔드 하나만 사용합니다.
+    """
     available_llms = [settings.DEFAULT_MODEL, "llama3:8b", "OpenAI API 키 사용"]
+    if settings.ROUTER_AUTO_ENABLED:
+        available_llms.insert(0, "자동 선택")
     llm_opt = st.sidebar.radio("LLM 선택", options=available_llms, key="SELECTED_LLM")
 
-    if llm_opt == "llama3:8b":
-        return ChatOllama(model="llama3", base_url=settings.OLLAMA_ENDPOINT)
+    default_name = f"openai:{settings.DEFAULT_MODEL}"
+    if llm_opt == "자동 선택":
+        return make_router(
+            {
+                default_name: get_chat_openai(settings.DEFAULT_MODEL, settings.OPENAI_API_KEY.get_secret_value()),
+                "ollama:llama3": get_chat_ollama("llama3"),
+            },
+            default_backend=default_name,
+            simple_backend="ollama:llama3"
+        )
+    elif llm_opt == "llama3:8b":
+        return make_router({"ollama:llama3": get_chat_ollama("llama3")}, "ollama:llama3")
     elif llm_opt == settings.DEFAULT_MODEL:
-        return ChatOpenAI(
-            model_name=llm_opt, 
-            temperature=0, 
-            streaming=True, 
-            api_key=settings.OPENAI_API_KEY.get_secret_value()
+        return make_router(
+            {default_name: get_chat_openai(llm_opt, settings.OPENAI_API_KEY.get_secret_value())}, default_name
         )
     else:
-        return handle_custom_openai_key()
+        model, chat_model = handle_custom_openai_key()
+        return make_router({f"openai:{model}": chat_model}, f"openai:{model}")
 
 def handle_custom_openai_key():
     api_key = st.sidebar.text_input(
@@ -55,4 +182,4 @@ def handle_custom_openai_key():
         key="SELECTED_OPENAI_MODEL"
     )
     
-    return ChatOpenAI(model_name=model, temperature=0, streaming=True, api_key=api_key)
+    return model, get_chat_openai(model, api_key)
@@ -0,0 +1,295 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.messages import AIMessage
+from loguru import logger
+from utils.answer_cache import WAITING_KEYWORDS
+
+# 짧고 단순한 질문으로 보는 키워드 (대기 현황, 메뉴, 식권, 운영시간, 인사)
+SIMPLE_INTENT_KEYWORDS = WAITING_KEYWORDS + (
+    "메뉴", "식권", "몇 시", "몇시", "운영", "영업", "가격", "얼마", "안녕", "감사", "고마워"
+)
+
+
+def provider_of(backend: str) -> str:
+    """백엔드 이름의 공급자('openai:gpt-4o-mini' -> 'openai')입니다."""
+    return backend.split(":")[0]
+
+
+def is_simple_query(query: str, max_chars: int = 30) -> bool:
+    query = query.strip()
+    return len(query) <= max_chars and any(keyword in query for keyword in SIMPLE_INTENT_KEYWORDS)
+
+
+class BackendStats:
+    """
+    백엔드별 최근 요청의 첫 토큰 지연 시간과 성공/실패를 window개까지 보관합니다.
+    여러 세션이 함께 기록하므로 잠금을 사용합니다.
+    """
+
+    def __init__(self, window: int = 200):
+        self._ttft = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.last_error_at = 0.0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record_ttft(self, seconds: float) -> None:
+        with self._lock:
+            self._ttft.append(seconds)
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.hedged += 1
+
+    def record_hedge_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+    def record_outcome(self, ok: bool) -> None:
+        with self._lock:
+            self._outcomes.append(ok)
+            if not ok:
+                self.last_error_at = time.monotonic()
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._ttft)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            requests = len(self._outcomes)
+            hedged, hedge_wins = self.hedged, self.hedge_wins
+        return {
+            "requests": requests,
+            "error_rate": round(self.error_rate(), 3),
+            "ttft_p50": self.percentile(0.5),
+            "ttft_p95": self.percentile(0.95),
+            "hedged": hedged,
+            "hedge_wins": hedge_wins,
+        }
+
+
+_stats: Dict[str, BackendStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_backend_stats(name: str, window: int = 200) -> BackendStats:
+    """같은 백엔드를 쓰는 모든 라우터가 통계를 공유합니다."""
+    with _stats_lock:
+        if name not in _stats:
+            _stats[name] = BackendStats(window)
+        return _stats[name]
+
+
+def backend_stats() -> Dict[str, Dict[str, float]]:
+    with _stats_lock:
+        names = list(_stats)
+    return {name: get_backend_stats(name).snapshot() for name in names}
+
+
+def flat_backend_stats() -> Dict[str, float]:
+    """지표 수집용으로 '백엔드_항목' 키의 평평한 딕셔너리를 반환합니다."""
+    return {
+        f"{name}_{key}": value
+        for name, snapshot in backend_stats().items()
+        for key, value in snapshot.items()
+        if value is not None
+    }
+
+
+class LLMRouter:
+    """
+    질문 종류와 백엔드별 최근 지연/오류율에 따라 LLM 백엔드를 고릅니다.
+    - 짧고 단순한 질문은 simple_backend(로컬 Ollama), 나머지는 default_backend(OpenAI)로 보냅니다.
+    - 오류율이 높은 백엔드는 error_cooldown 동안 뒤로 미룹니다.
+    - 첫 번째 요청이 p95 기반 마감 안에 첫 토큰을 내지 못하면 다음 백엔드에 같은 요청을 동시에 보내고(hedge),
+      먼저 내용이 있는 토큰을 낸 쪽의 응답만 화면에 표시합니다. (역할/사용량만 담긴 빈 청크는 첫 토큰으로 보지 않습니다.)
+    - 토큰이 나오기 전에 실패하면 다음 백엔드로 넘어갑니다.
+    - admission(AdmissionController)을 주면 백엔드마다 요청을 시작할 때 그 공급자의 자리를 얻고, 스트림이 끝나면 돌려줍니다.
+      첫 요청과 전환 요청은 차례를 기다리고, hedge 요청은 바로 자리가 있을 때만 보냅니다.
+    스트리밍은 워커 스레드에서 하고 화면 갱신은 호출한 스레드에서만 하므로 Streamlit API를 워커에서 쓰지 않습니다.
+    """
+
+    def __init__(self, backends: Dict[str, object], default_backend: str, simple_backend: Optional[str] = None,
+                 simple_max_chars: int = 30, hedge: bool = True, hedge_min_delay: float = 1.0,
+                 hedge_max_delay: float = 5.0, max_error_rate: float = 0.5, error_cooldown: float = 30.0,
+                 total_timeout: float = 90.0, stats_window: int = 200):
+        self.backends = backends
+        self.default_backend = default_backend
+        self.simple_backend = simple_backend if simple_backend in backends else None
+        self.simple_max_chars = simple_max_chars
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.max_error_rate = max_error_rate
+        self.error_cooldown = error_cooldown
+        self.total_timeout = total_timeout
+        self.stats = {name: get_backend_stats(name, stats_window) for name in backends}
+
+    def _healthy(self, name: str) -> bool:
+        stats = self.stats[name]
+        if stats.error_rate() <= self.max_error_rate:
+            return True
+        # 마지막 오류 후 cooldown이 지나면 다시 시도해 봅니다.
+        return time.monotonic() - stats.last_error_at > self.error_cooldown
+
+    def order(self, user_query: str) -> List[str]:
+        """시도할 백엔드 순서를 반환합니다."""
+        primary = self.default_backend
+        if self.simple_backend and is_simple_query(user_query, self.simple_max_chars):
+            primary = self.simple_backend
+        names = [primary] + [name for name in self.backends if name != primary]
+        return [n for n in names if self._healthy(n)] + [n for n in names if not self._healthy(n)]
+
+    def provider_for(self, user_query: str) -> str:
+        """첫 번째로 시도할 백엔드의 공급자 이름('openai:gpt-4o-mini' -> 'openai')입니다."""
+        return provider_of(self.order(user_query)[0])
+
+    def hedge_delay(self, name: str) -> float:
+        p95 = self.stats[name].percentile(0.95)
+        if p95 is None:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p95))
+
+    def _stream(self, name: str, messages, events: queue.Queue, cancel: threading.Event, admission=None) -> None:
+        started = time.perf_counter()
+        first = True
+        try:
+            for chunk in self.backends[name].stream(messages):
+                if first and chunk.content:
+                    self.stats[name].record_ttft(time.perf_counter() - started)
+                    first = False
+                if cancel.is_set():
+                    return
+                events.put((name, "token", chunk))
+            events.put((name, "end", None))
+        except Exception as e:
+            events.put((name, "error", e))
+        finally:
+            # 취소된 스트림도 연결이 끊길 때까지는 자리를 차지하므로 여기서 돌려줍니다.
+            if admission is not None:
+                admission.release(provider_of(name))
+
+    def invoke(self, messages, handler=None, user_query: str = "", admission=None, session_id: str = "",
+               on_queue_position: Optional[Callable[[int], None]] = None) -> Tuple[object, str]:
+        """
+        응답 메시지와 응답한 백엔드 이름을 반환합니다.
+        handler(StreamHandler)에는 선택된 백엔드의 토큰만 전달합니다.
+        admission이 있으면 차례를 기다리는 동안 on_queue_position(대기 순서)이 호출 스레드에서 불리고,
+        차례가 오지 않으면 AdmissionTimeout이 발생합니다.
+        """
+        candidates = self.order(user_query)
+        events: queue.Queue = queue.Queue()
+        cancels: Dict[str, threading.Event] = {}
+        running: List[str] = []
+        last_error: Optional[Exception] = None
+
+        def start(name: str, wait: bool = True) -> bool:
+            if admission is not None:
+                if wait:
+                    admission.acquire(provider_of(name), session_id, on_queue_position)
+                elif not admission.try_acquire(provider_of(name)):
+                    return False
+            cancels[name] = threading.Event()
+            running.append(name)
+            threading.Thread(
+                target=self._stream, args=(name, messages, events, cancels[name], admission),
+                name=f"llm-{name}", daemon=True
+            ).start()
+            return True
+
+        start(candidates.pop(0))
+        if handler is not None:
+            handler.on_llm_start(None, [])
+        started = time.monotonic()
+        hedge_at = started + self.hedge_delay(running[0]) if self.hedge and candidates else None
+        winner: Optional[str] = None
+        # 백엔드별로 받은 청크를 합친 메시지 (승자가 정해지기 전 빈 청크도 승자의 메시지에 포함합니다)
+        partial: Dict[str, object] = {}
+
+        while True:
+            now = time.monotonic()
+            if now - started > self.total_timeout:
+                for event in cancels.values():
+                    event.set()
+                raise TimeoutError(f"LLM 응답이 {self.total_timeout:.0f}초 안에 끝나지 않았습니다.")
+            timeout = self.total_timeout - (now - started)
+            if winner is None and hedge_at is not None:
+                timeout = min(timeout, max(0.0, hedge_at - now))
+            try:
+                name, kind, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                if winner is None and hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    if not start(candidates[0], wait=False):
+                        logger.info(f"'{candidates[0]}' 공급자에 자리가 없어 hedge 요청을 보내지 않음")
+                        continue
+                    self.stats[running[0]].record_hedge()
+                    logger.info(f"'{running[0]}' 첫 토큰 지연, '{candidates[0]}'에 동시 요청")
+                    candidates.pop(0)
+                continue
+
+            if kind == "token":
+                if winner is not None and name != winner:
+                    continue
+                partial[name] = payload if name not in partial else partial[name] + payload
+                if winner is None:
+                    if not payload.content:
+                        continue
+                    winner = name
+                    hedge_at = None
+                    if name != running[0]:
+                        self.stats[name].record_hedge_win()
+                    for other, event in cancels.items():
+                        if other != name:
+                            event.set()
+                if handler is not None and payload.content:
+                    handler.on_llm_new_token(payload.content)
+            elif kind == "end":
+                if winner is None:
+                    # 토큰 없이 끝난 응답(빈 답변)도 그대로 사용합니다.
+                    winner = name
+                if name == winner:
+                    self.stats[name].record_outcome(True)
+                    break
+            elif kind == "error":
+                self.stats[name].record_outcome(False)
+                logger.warning(f"LLM 백엔드 '{name}' 오류: {str(payload)}")
+                last_error = payload
+                if name == winner:
+                    # 이미 일부 답변을 표시했으므로 다른 백엔드로 넘기지 않습니다.
+                    raise payload
+                running.remove(name)
+                if winner is None and not running:
+                    if not candidates:
+                        raise last_error
+                    logger.info(f"'{candidates[0]}' 백엔드로 전환")
+                    start(candidates.pop(0))
+                    hedge_at = time.monotonic() + self.hedge_delay(running[0]) if self.hedge and candidates else None
+
+        for other, event in cancels.items():
+            if other != winner:
+                event.set()
+        if handler is not None:
+            handler.finish()
+        message = partial.get(winner)
+        if message is None:
+            message = AIMessage(content="")
+        logger.info(f"LLM 라우팅: '{winner}' 응답 ({(time.monotonic() - started) * 1000:.0f}ms)")
+        return message, winner
+
+    def stats_snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
@@ -1,13 +1,67 @@
+import random
+import sys
+import threading
 from loguru import logger
 from config.settings import settings
 
+_configured = False
+_configure_lock = threading.Lock()
+
+def _patch_record(record):
+    # extra로 붙인 질문/답변 원문처럼 긴 필드만 잘라서 기록합니다.
+    # 로그 메시지 자체(예외 내용, 오류 설명)는 진단에 필요하므로 자르지 않습니다.
+    for key, value in record["extra"].items():
+        if isinstance(value, str):
+            record["extra"][key] = truncate_string(value, settings.LOG_MAX_FIELD_CHARS)
+
+def _sample(record) -> bool:
+    """event로 표시된 대량 이벤트는 LOG_SAMPLE_RATES 비율만 남깁니다. WARNING 이상은 항상 남깁니다."""
+    if record["level"].no >= logger.level("WARNING").no:
+        return True
+    event = record["extra"].get("event")
+    if event is None:
+        return True
+    rate = settings.LOG_SAMPLE_RATES.get(event, 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+def configure_langchain_debug():
+    # 운영 환경에서는 체인 프롬프트 전체를 stdout에 출력하지 않습니다.
+    from langchain.globals import set_debug, set_verbose
+    set_verbose(settings.LANGCHAIN_VERBOSE)
+    set_debug(settings.LANGCHAIN_VERBOSE)
+
 def setup_logging():
-    logger.add("logs/app.log", rotation="500 MB", level="INFO")
-    if settings.OPENAI_API_KEY:
-        masked_key = f"{settings.OPENAI_API_KEY.get_secret_value()[:5]}...{settings.OPENAI_API_KEY.get_secret_value()[-5:]}"
-        logger.info(f"OPENAI_API_KEY loaded: {masked_key}")
-    else:
-        logger.error("OPENAI_API_KEY is not set in the environment variables.")
+    """
+    로그는 백그라운드 스레드(enqueue)로 기록해 요청 스레드가 디스크/stdout 쓰기를 기다리지 않게 합니다.
+    파일은 JSON 한 줄씩 기록하고, 크기 기준으로 회전해 압축하며 보관 기간이 지나면 지웁니다.
+    Streamlit은 매 입력마다 스크립트를 다시 실행하므로 프로세스당 한 번만 설정합니다.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+        logger.remove()
+        logger.configure(patcher=_patch_record)
+        logger.add(sys.stderr, level=settings.LOG_CONSOLE_LEVEL, filter=_sample, enqueue=True)
+        logger.add(
+            settings.LOG_PATH,
+            level="INFO",
+            filter=_sample,
+            serialize=settings.LOG_JSON,
+            enqueue=True,
+            rotation=settings.LOG_ROTATION,
+            retention=settings.LOG_RETENTION,
+            compression=settings.LOG_COMPRESSION
+        )
+        configure_langchain_debug()
+
+        if settings.OPENAI_API_KEY:
+            masked_key = f"{settings.OPENAI_API_KEY.get_secret_value()[:5]}...{settings.OPENAI_API_KEY.get_secret_value()[-5:]}"
+            logger.info(f"OPENAI_API_KEY loaded: {masked_key}")
+        else:
+            logger.error("OPENAI_API_KEY is not set in the environment variables.")
 
 def truncate_string(s, max_length=100):
     return s if len(s) <= max_length else s[:max_length] + '...'
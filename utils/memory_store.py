@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+from langchain_core.memory import BaseMemory
+from loguru import logger
+
+
+@dataclass
+class _SessionEntry:
+    memory: BaseMemory
+    last_access: float = field(default_factory=time.monotonic)
+
+
+class SessionMemoryStore:
+    """
+    세션 ID별 대화 메모리를 보관합니다.
+    오래 사용되지 않은 세션과 최대 세션 수를 넘는 세션은 LRU 순서로 제거합니다.
+    """
+
+    def __init__(self, memory_factory: Callable[[], BaseMemory],
+                 max_sessions: int = 500, idle_timeout: float = 1800.0):
+        self.memory_factory = memory_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created_total = 0
+        self.evicted_total = 0
+
+    def get(self, session_id: str) -> BaseMemory:
+        if not session_id:
+            raise ValueError("session_id는 필수값입니다.")
+        with self._lock:
+            self._evict_locked()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = _SessionEntry(memory=self.memory_factory())
+                self._sessions[session_id] = entry
+                self.created_total += 1
+                self._evict_locked()
+            else:
+                entry.last_access = time.monotonic()
+                self._sessions.move_to_end(session_id)
+            return entry.memory
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict_locked(self) -> None:
+        now = time.monotonic()
+        # 가장 오래 전에 사용된 세션부터 확인하므로 유휴 세션이 아니면 바로 멈춥니다.
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry.last_access <= self.idle_timeout and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted_total += 1
+            logger.debug(f"대화 메모리 제거됨: {session_id}")
+
+    def stats(self) -> Dict[str, int]:
+        """살아있는 세션 수와 메모리 사용량(메시지 수, 대략적인 바이트 수)을 반환합니다."""
+        with self._lock:
+            entries = list(self._sessions.values())
+        messages = 0
+        approx_bytes = 0
+        for entry in entries:
+            chat_memory = getattr(entry.memory, 'chat_memory', None)
+            if chat_memory is None:
+                continue
+            for message in chat_memory.messages:
+                messages += 1
+                approx_bytes += len(str(message.content).encode('utf-8'))
+        return {
+            "live_sessions": len(entries),
+            "messages": messages,
+            "approx_bytes": approx_bytes,
+            "created_total": self.created_total,
+            "evicted_total": self.evicted_total,
+        }
@@ -0,0 +1,187 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+WEEKDAYS = "월화수목금토일"
+KOREAN_NUMBERS = {"한": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+MAX_TICKETS = 20
+
+TICKET_ORDER_PATTERN = re.compile(
+    r"^(?:식권)?(?P<count>\d{1,2}|다섯|여섯|일곱|여덟|아홉|한|두|세|네|열)장"
+    r"(?:만)?(?:주문|구매|구입|살게요|살게|사고싶어요)?"
+    r"(?:할게요|할께요|할게|해요|해주세요|하겠습니다|합니다|주세요|줘|요|부탁해요|부탁드려요|부탁드립니다)?$"
+)
+MENU_LOOKUP_PATTERN = re.compile(
+    r"^(?:오늘|금일)?(?:의)?(?:급식|점심)?(?:메뉴|식단)(?:는|은|가|이)?"
+    r"(?:뭔가요|뭐예요|뭐에요|뭐야|뭐|무엇인가요|뭐있어요|알려줘|알려주세요|요)?$"
+)
+
+
+@dataclass
+class MenuItem:
+    name: str
+    price: int
+    category: str = ""
+
+
+@dataclass
+class StoreMenu:
+    title: str
+    ticket_price: Optional[int] = None
+    weekday_menus: Dict[str, str] = field(default_factory=dict)
+    items: List[MenuItem] = field(default_factory=list)
+    # 요일 글자 -> (시작, 종료) "HH:MM"
+    hours: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+
+    def is_open(self, weekday: str, time_hhmm: str) -> bool:
+        span = self.hours.get(weekday[:1])
+        return span is not None and span[0] <= time_hhmm <= span[1]
+
+
+@dataclass
+class PaymentInfo:
+    payment_link: Optional[str] = None
+    survey_link: Optional[str] = None
+    pickup_message: Optional[str] = None
+
+
+def _parse_price(text: str) -> int:
+    return int(text.replace(",", ""))
+
+
+def _expand_weekdays(spec: str) -> List[str]:
+    days = []
+    for part in re.split(r"[,\s]+", spec.strip()):
+        if "~" in part:
+            start, end = part.split("~", 1)
+            if start in WEEKDAYS and end in WEEKDAYS:
+                days.extend(WEEKDAYS[WEEKDAYS.index(start):WEEKDAYS.index(end) + 1])
+        elif part in WEEKDAYS:
+            days.append(part)
+    return days
+
+
+@lru_cache(maxsize=64)
+def parse_store_document(content: str) -> StoreMenu:
+    """
+    매장 문서(markdown)를 메뉴/가격/운영시간 구조로 변환합니다.
+    """
+    lines = content.splitlines()
+    title = next((line.strip().lstrip("#").strip() for line in lines if line.strip()), "")
+    menu = StoreMenu(title=title)
+
+    section = ""
+    for line in lines:
+        stripped = line.strip()
+        header = re.match(r"^(\S[^:]*?)\s*:\s*$", stripped)
+        if header:
+            section = header.group(1)
+            continue
+
+        ticket = re.match(r"^1인\s*:\s*([\d,]+)원", stripped)
+        if ticket:
+            menu.ticket_price = _parse_price(ticket.group(1))
+            continue
+
+        weekday_menu = re.match(r"^-\s*\*\*([월화수목금토일])요일:\*\*\s*(.+)$", stripped)
+        if weekday_menu:
+            menu.weekday_menus[weekday_menu.group(1)] = weekday_menu.group(2).strip()
+            continue
+
+        if section.startswith("운영시간"):
+            hours = re.match(r"^-\s*(\S+)\s+(\d{1,2}:\d{2})\s*~\s*(\d{1,2}:\d{2})", stripped)
+            if hours:
+                for day in _expand_weekdays(hours.group(1)):
+                    menu.hours[day] = (hours.group(2).zfill(5), hours.group(3).zfill(5))
+            continue
+
+        if section.startswith("메뉴"):
+            row = line.strip("\n").strip().split("\t")
+            if len(row) == 3 and row[2].strip().isdigit():
+                menu.items.append(MenuItem(name=row[1].strip(), price=int(row[2]), category=row[0].strip()))
+                continue
+            item = re.match(r"^-\s*(?:\*\*)?(.+?):(?:\*\*)?\s*([\d,]+)원\s*$", stripped)
+            if item:
+                menu.items.append(MenuItem(name=item.group(1).strip(), price=_parse_price(item.group(2))))
+    return menu
+
+
+@lru_cache(maxsize=8)
+def parse_payment_info(common_instructions: str) -> PaymentInfo:
+    payment_link = re.search(r"https://qr\.kakaopay\.com/\S+", common_instructions)
+    survey_link = re.search(r"https://docs\.google\.com/forms/\S+", common_instructions)
+    pickup_message = re.search(r"\"(송금을 완료[^\"]+)\"", common_instructions)
+    return PaymentInfo(
+        payment_link=payment_link.group(0).rstrip(".") if payment_link else None,
+        survey_link=survey_link.group(0).rstrip(".") if survey_link else None,
+        pickup_message=pickup_message.group(1) if pickup_message else None,
+    )
+
+
+def _normalize(query: str) -> str:
+    return re.sub(r"[^\w]", "", query)
+
+
+def _ticket_count(text: str) -> int:
+    return int(text) if text.isdigit() else KOREAN_NUMBERS[text]
+
+
+def ticket_order_count(user_query: str) -> Optional[int]:
+    """식권 주문 질문이면 주문 장수를, 아니면 None을 반환합니다."""
+    ticket = TICKET_ORDER_PATTERN.match(_normalize(user_query))
+    return _ticket_count(ticket.group("count")) if ticket else None
+
+
+def answer_ticket_order(count: int, menu: StoreMenu, payment: PaymentInfo) -> str:
+    total = count * menu.ticket_price
+    lines = [f"식권 {count}장, 총 결제 금액은 **{total:,}원**입니다. (1인 {menu.ticket_price:,}원)"]
+    lines.append(f"- 카카오페이 송금 링크: {payment.payment_link}")
+    if payment.pickup_message:
+        lines.append(f"- {payment.pickup_message}")
+    if payment.survey_link:
+        lines.append(
+            f"- 설문조사에 연락처를 남겨주시면 추첨을 통해 기프티콘을 드려요: {payment.survey_link}"
+        )
+    return "\n".join(lines)
+
+
+def answer_menu_lookup(weekday: str, menu: StoreMenu) -> Optional[str]:
+    today_menu = menu.weekday_menus.get(weekday[:1])
+    if today_menu:
+        lines = [f"오늘({weekday}) {menu.title} 메뉴입니다.", f"- {today_menu}"]
+        if menu.ticket_price:
+            lines.append(f"- 가격: 1인 {menu.ticket_price:,}원")
+            lines.append("식권 몇 장 구매하시겠어요?")
+        return "\n".join(lines)
+    if menu.items and not menu.weekday_menus:
+        lines = [f"{menu.title} 메뉴입니다."]
+        lines.extend(f"- {item.name}: {item.price:,}원" for item in menu.items)
+        lines.append("주문하실 메뉴를 알려주세요.")
+        return "\n".join(lines)
+    return None
+
+
+def answer_fast_path(user_query: str, store_document: str, common_instructions: str,
+                     time_info: Dict[str, str]) -> Optional[str]:
+    """
+    매장 문서만으로 정확히 답할 수 있는 질문(식권 주문, 오늘 메뉴)이면 답변을 만들어 반환합니다.
+    확실하지 않거나 영업시간이 아니면 None을 반환해 LLM이 처리하도록 합니다.
+    """
+    query = _normalize(user_query)
+    menu = parse_store_document(store_document)
+    weekday = time_info['weekday']
+    if not menu.is_open(weekday, time_info['time']):
+        return None
+
+    ticket = TICKET_ORDER_PATTERN.match(query)
+    if ticket:
+        payment = parse_payment_info(common_instructions)
+        count = _ticket_count(ticket.group("count"))
+        if menu.ticket_price and payment.payment_link and 0 < count <= MAX_TICKETS:
+            return answer_ticket_order(count, menu, payment)
+        return None
+
+    if MENU_LOOKUP_PATTERN.match(query):
+        return answer_menu_lookup(weekday, menu)
+    return None
@@ -0,0 +1,234 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from loguru import logger
+
+PREFIX = "holtz"
+# 초 단위 지연 시간 히스토그램 구간
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{PREFIX}_{name}")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(labels) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> Optional[float]:
+        """구간 상한으로 근사한 분위수입니다. 마지막 구간을 넘으면 inf를 반환합니다."""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    프로세스 안에서 구간(span) 시간 히스토그램과 카운터를 모읍니다.
+    다른 모듈의 통계(stats())는 collector로 등록해 함께 내보냅니다.
+    Prometheus 텍스트 형식과 JSON으로 내보낼 수 있습니다.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._collectors: Dict[str, Callable[[], Dict]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def register_collector(self, name: str, collect: Callable[[], Dict]) -> None:
+        """collect는 {지표 이름: 숫자} 딕셔너리를 반환해야 하며 gauge로 내보냅니다."""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def _collect(self) -> Dict[str, Dict]:
+        with self._lock:
+            collectors = dict(self._collectors)
+        results = {}
+        for name, collect in collectors.items():
+            try:
+                results[name] = collect()
+            except Exception as e:
+                logger.warning(f"지표 수집 실패 ({name}): {str(e)}")
+        return results
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """블록 실행 시간을 span_seconds 히스토그램에 기록하고, 예외가 나면 span_errors_total을 올립니다."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc("span_errors_total", span=name, **labels)
+            raise
+        finally:
+            self.observe("span_seconds", time.perf_counter() - started, span=name, **labels)
+
+    def timed(self, name: Optional[str] = None, **labels):
+        """함수 실행 시간을 span으로 기록하는 데코레이터입니다. 이름을 생략하면 모듈.함수명을 사용합니다."""
+        def decorator(func):
+            span_name = name or f"{func.__module__.split('.')[-1]}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            histograms = {
+                name: {
+                    ",".join(f"{k}={v}" for k, v in key) or "_": {
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "p99": h.quantile(0.99),
+                    }
+                    for key, h in series.items()
+                }
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: {",".join(f"{k}={v}" for k, v in key) or "_": value for key, value in series.items()}
+                for name, series in self._counters.items()
+            }
+        return {"histograms": histograms, "counters": counters, "collectors": self._collect()}
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in self._histograms.items():
+                metric = _metric_name(name)
+                lines.append(f"# TYPE {metric} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(key, {'le': str(bound)})} {cumulative}")
+                    lines.append(f"{metric}_bucket{_format_labels(key, {'le': '+Inf'})} {h.count}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {h.sum}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {h.count}")
+            for name, series in self._counters.items():
+                metric = _metric_name(name)
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{_format_labels(key)} {value}")
+        for collector, values in self._collect().items():
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = _metric_name(f"{collector}_{key}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"generated_at": time.time(), **self.to_dict()}, file, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+
+metrics = MetricsRegistry()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """/metrics(Prometheus 텍스트)와 /metrics.json을 제공하는 로컬 HTTP 서버를 시작합니다."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = metrics.render_prometheus().encode('utf-8')
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body = json.dumps(metrics.to_dict(), ensure_ascii=False, default=str).encode('utf-8')
+                content_type = "application/json; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"지표 서버 시작: http://{host}:{port}/metrics")
+    return server
+
+
+def start_json_dump(path: str, interval: float = 60.0) -> threading.Thread:
+    """interval초마다 지표를 JSON 파일로 저장합니다."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                metrics.dump_json(path)
+            except Exception as e:
+                logger.warning(f"지표 JSON 저장 실패: {str(e)}")
+    thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
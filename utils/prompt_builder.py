@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import tiktoken
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from loguru import logger
+
+# 메시지마다 붙는 역할/구분자 토큰의 대략적인 크기
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    messages: List[BaseMessage] = field(default_factory=list)
+    system_text: str = ""
+    volatile_text: str = ""
+    section_tokens: Dict[str, int] = field(default_factory=dict)
+    total_tokens: int = 0
+    history: List[Tuple[str, str]] = field(default_factory=list)
+    history_turns: int = 0
+    dropped_turns: int = 0
+
+
+class PromptBuilder:
+    """
+    프롬프트의 각 구성 요소를 한 번씩만 넣어 조립합니다.
+    매장별로 변하지 않는 지시사항은 system 메시지 앞부분에 두어 공급자의 프롬프트 캐시를 재사용하고,
+    시간/대기 현황/질문처럼 매번 바뀌는 내용은 마지막 user 메시지에 둡니다.
+    토큰 예산을 넘으면 가장 오래된 대화부터 잘라냅니다.
+    """
+
+    def __init__(self, model: str = "gpt-4o-mini", budget_tokens: int = 6000):
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.budget_tokens = budget_tokens
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    @staticmethod
+    def format_turn(role: str, content: str) -> str:
+        speaker = "사용자" if role in ("user", "human") else "챗봇"
+        return f"{speaker}: {content}"
+
+    @classmethod
+    def render_text(cls, system_text: str, history: List[Tuple[str, str]], volatile_text: str) -> str:
+        history_text = "\n".join(cls.format_turn(role, content) for role, content in history)
+        return f"{system_text}\n\n이전 대화 내용:\n{history_text}\n\n{volatile_text}"
+
+    @staticmethod
+    def build_system_text(common_instructions: str, project_instructions: str) -> str:
+        return f"공통 지시사항:\n{common_instructions}\n\n프로젝트 지시사항:\n{project_instructions}"
+
+    @staticmethod
+    def build_volatile_text(time_info: Dict[str, str], waiting_info: str, user_query: str,
+                            retrieved_context: str = "") -> str:
+        text = (
+            "현재 시간 정보:\n"
+            f"- 날짜: {time_info['date']}\n"
+            f"- 요일: {time_info['weekday']}\n"
+            f"- 시간 (한국): {time_info['time']}\n\n"
+            f"대기 현황 정보:\n{waiting_info}\n\n"
+        )
+        if retrieved_context:
+            text += f"질문 관련 매장 정보:\n{retrieved_context}\n\n"
+        return text + f"사용자 질문: {user_query}"
+
+    def build(self, common_instructions: str, project_instructions: str, time_info: Dict[str, str],
+              waiting_info: str, history: List[Tuple[str, str]], user_query: str,
+              retrieved_context: str = "") -> BuiltPrompt:
+        """
+        history는 (role, content) 목록이며 오래된 순서입니다.
+        현재 질문은 history에 포함하지 않습니다.
+        retrieved_context는 질문마다 검색된 매장 문서 일부로, 매번 바뀌므로 user 메시지에 넣습니다.
+        """
+        system_text = self.build_system_text(common_instructions, project_instructions)
+        volatile_text = self.build_volatile_text(time_info, waiting_info, user_query, retrieved_context)
+        section_tokens = {
+            "common_instructions": self.count(common_instructions),
+            "project_instructions": self.count(project_instructions),
+            "retrieved_context": self.count(retrieved_context),
+            "system": self.count(system_text) + MESSAGE_OVERHEAD_TOKENS,
+            "volatile": self.count(volatile_text) + MESSAGE_OVERHEAD_TOKENS,
+        }
+
+        # 최신 대화부터 예산 안에 들어가는 만큼만 남깁니다.
+        remaining = self.budget_tokens - section_tokens["system"] - section_tokens["volatile"]
+        kept: List[Tuple[str, str]] = []
+        history_tokens = 0
+        for role, content in reversed(history):
+            turn_tokens = self.count(content) + MESSAGE_OVERHEAD_TOKENS
+            if history_tokens + turn_tokens > remaining:
+                break
+            kept.append((role, content))
+            history_tokens += turn_tokens
+        kept.reverse()
+        dropped = len(history) - len(kept)
+        if dropped:
+            logger.debug(f"토큰 예산 초과로 이전 대화 {dropped}개 제외됨")
+        section_tokens["history"] = history_tokens
+
+        messages: List[BaseMessage] = [SystemMessage(content=system_text)]
+        for role, content in kept:
+            if role in ("user", "human"):
+                messages.append(HumanMessage(content=content))
+            else:
+                messages.append(AIMessage(content=content))
+        messages.append(HumanMessage(content=volatile_text))
+
+        # 저장/로그용으로 전체 프롬프트를 하나의 문자열로도 남깁니다.
+        text = self.render_text(system_text, kept, volatile_text)
+        return BuiltPrompt(
+            text=text,
+            messages=messages,
+            system_text=system_text,
+            volatile_text=volatile_text,
+            section_tokens=section_tokens,
+            total_tokens=section_tokens["system"] + history_tokens + section_tokens["volatile"],
+            history=kept,
+            history_turns=len(kept),
+            dropped_turns=dropped,
+        )
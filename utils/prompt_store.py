@@ -0,0 +1,125 @@
+import base64
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from loguru import logger
+from utils.prompt_builder import BuiltPrompt, PromptBuilder
+
+SNAPSHOT_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress(text: str) -> str:
+    return base64.b64encode(zlib.compress(text.encode('utf-8'), 9)).decode('ascii')
+
+
+def decompress(data: str) -> str:
+    return zlib.decompress(base64.b64decode(data)).decode('utf-8')
+
+
+class PromptStore:
+    """
+    매 턴 반복되는 system 프롬프트(공통 지시사항 + 매장 정보)를 해시로 한 번만 저장하고,
+    메시지에는 해시 참조와 매번 바뀌는 부분만 남깁니다.
+    이전 대화는 같은 세션의 앞선 메시지에서 복원하므로 저장하지 않습니다.
+    blob 해시는 저장이 확인된 뒤에만 기억하고, 저장에 실패한 blob은 다음 턴에 다시 보냅니다.
+    """
+
+    def __init__(self, chat_session_manager, known_hashes_limit: int = 1024):
+        self.chat_session_manager = chat_session_manager
+        self.known_hashes_limit = known_hashes_limit
+        self._known: "OrderedDict[str, None]" = OrderedDict()
+        # write queue에 들어가 저장을 기다리는 해시 (같은 blob을 여러 번 넣지 않습니다)
+        self._pending = set()
+        self._lock = threading.Lock()
+        write_queue = chat_session_manager.write_queue
+        if write_queue:
+            write_queue.add_blob_listener(self._on_blobs_written)
+
+    def _remember(self, blob_hash: str) -> None:
+        self._known[blob_hash] = None
+        while len(self._known) > self.known_hashes_limit:
+            self._known.popitem(last=False)
+
+    def _on_blobs_written(self, hashes: List[str], written: bool) -> None:
+        with self._lock:
+            for blob_hash in hashes:
+                self._pending.discard(blob_hash)
+                if written:
+                    self._remember(blob_hash)
+
+    def _store_blob(self, text: str) -> str:
+        blob_hash = content_hash(text)
+        write_queue = self.chat_session_manager.write_queue
+        with self._lock:
+            if blob_hash in self._known:
+                self._known.move_to_end(blob_hash)
+                return blob_hash
+            if blob_hash in self._pending:
+                return blob_hash
+            if write_queue:
+                self._pending.add(blob_hash)
+        row = {'hash': blob_hash, 'content': compress(text), 'created_at': datetime.utcnow().isoformat()}
+        if write_queue:
+            write_queue.enqueue_blob(row)
+        else:
+            self.chat_session_manager.backend.insert_blobs([row])
+            with self._lock:
+                self._remember(blob_hash)
+        logger.debug(f"프롬프트 blob 저장: {blob_hash[:12]} ({len(text)}자)")
+        return blob_hash
+
+    def snapshot(self, prompt: BuiltPrompt) -> Dict:
+        """chat_messages.question에 넣을 프롬프트 참조를 만듭니다."""
+        return {
+            "v": SNAPSHOT_VERSION,
+            "system_ref": self._store_blob(prompt.system_text),
+            "history_messages": len(prompt.history),
+            "volatile": prompt.volatile_text,
+        }
+
+    def reconstruct(self, session_id: str, message_id) -> Optional[str]:
+        """
+        저장된 메시지의 전체 프롬프트를 다시 조립합니다.
+        예전 형식(full_query를 그대로 저장한 메시지)은 그 값을 반환합니다.
+        """
+        rows: List[Dict] = []
+        target = None
+        for page in self.chat_session_manager.iter_session_messages(
+                session_id, columns=["question", "answer.text"], page_size=200):
+            for row in page:
+                if row['id'] == message_id:
+                    target = row
+                    break
+                rows.append(row)
+            if target is not None:
+                break
+        if target is None:
+            return None
+
+        question = target['question']
+        if "full_query" in question:
+            return question["full_query"]
+        snapshot = question.get("prompt")
+        if not snapshot:
+            return None
+
+        blobs = self.chat_session_manager.backend.select_blobs([snapshot["system_ref"]])
+        if snapshot["system_ref"] not in blobs:
+            logger.error(f"프롬프트 blob을 찾을 수 없습니다: {snapshot['system_ref']}")
+            return None
+        system_text = decompress(blobs[snapshot["system_ref"]])
+
+        history = []
+        for row in rows:
+            history.append(("human", row['question'].get('text', '')))
+            history.append(("ai", row.get('answer_text') or ''))
+        count = snapshot.get("history_messages", 0)
+        history = history[-count:] if count else []
+        return PromptBuilder.render_text(system_text, history, snapshot["volatile"])
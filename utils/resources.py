@@ -0,0 +1,47 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Hashable
+from loguru import logger
+
+
+class ResourceRegistry:
+    """
+    Streamlit 재실행과 세션에 관계없이 프로세스당 한 번만 만들어야 하는 객체
+    (API 클라이언트, 인증 정보, LLM 등)를 보관합니다.
+    """
+
+    def __init__(self):
+        self._resources: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        resource = self._resources.get(key)
+        if resource is not None:
+            return resource
+
+        # 키별 잠금을 사용해 느린 생성이 다른 리소스 조회를 막지 않도록 합니다.
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            resource = self._resources.get(key)
+            if resource is None:
+                resource = factory()
+                self._resources[key] = resource
+                logger.info(f"공유 리소스 생성됨: {key}")
+            return resource
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._resources.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+
+def fingerprint(secret: str) -> str:
+    """비밀값을 리소스 키로 쓰기 위한 짧은 해시를 만듭니다."""
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
+
+
+registry = ResourceRegistry()
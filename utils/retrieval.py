@@ -0,0 +1,263 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+INDEX_VERSION = 1
+# 질문과 관계없이 항상 포함하는 섹션 (시간에 따른 답변에 필요)
+PINNED_SECTIONS = ("운영시간",)
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    단어 단위 토큰과 한글 단어의 글자 bigram을 함께 사용합니다.
+    조사가 붙은 단어('메뉴는')도 '메뉴'와 겹치도록 하기 위함입니다.
+    """
+    tokens = []
+    for word in re.findall(r"\w+", text.lower()):
+        tokens.append(word)
+        if len(word) > 2 and re.search(r"[가-힣]", word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def chunk_document(content: str, max_chars: int = 300) -> List[Tuple[str, str]]:
+    """
+    문서를 빈 줄 기준 문단으로 나누고, 긴 문단은 줄 단위로 max_chars 이하로 자릅니다.
+    (섹션 이름, 청크 텍스트) 목록을 반환하며, 잘린 청크에는 섹션 제목을 다시 붙입니다.
+    """
+    chunks = []
+    for paragraph in re.split(r"\n\s*\n", content):
+        paragraph = paragraph.strip("\n")
+        if not paragraph.strip():
+            continue
+        lines = paragraph.splitlines()
+        first = lines[0].strip()
+        section = first.rstrip(":").strip() if first.endswith(":") else ""
+        if len(paragraph) <= max_chars:
+            chunks.append((section, paragraph))
+            continue
+        header = lines[0] if section else ""
+        body = lines[1:] if section else lines
+        current: List[str] = []
+        for line in body:
+            if current and len(header) + sum(len(l) + 1 for l in current) + len(line) > max_chars:
+                chunks.append((section, "\n".join([header] + current if header else current)))
+                current = []
+            current.append(line)
+        if current:
+            chunks.append((section, "\n".join([header] + current if header else current)))
+    return chunks
+
+
+@dataclass
+class Chunk:
+    store: str
+    section: str
+    text: str
+    terms: Dict[str, int]
+    length: int
+
+
+class StoreIndex:
+    """
+    매장 문서 청크에 대한 BM25 색인입니다.
+    문서 내용 해시가 바뀐 매장만 다시 색인하고, 결과를 디스크(JSON)에 저장합니다.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_chunk_chars: int = 300):
+        self.path = path
+        self.max_chunk_chars = max_chunk_chars
+        self._docs: Dict[str, Dict] = {}
+        self._stats: Dict[str, Tuple[Dict[str, int], float]] = {}
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if data.get("version") != INDEX_VERSION or data.get("max_chunk_chars") != self.max_chunk_chars:
+                return
+            with self._lock:
+                self._docs = {
+                    name: {
+                        "hash": doc["hash"],
+                        "chunks": [Chunk(store=name, **chunk) for chunk in doc["chunks"]],
+                    }
+                    for name, doc in data["docs"].items()
+                }
+                self._stats = {name: self._compute_stats(doc["chunks"]) for name, doc in self._docs.items()}
+            logger.info(f"매장 문서 색인 로드됨: {self.path} ({len(self._docs)}개 문서)")
+        except Exception as e:
+            logger.error(f"매장 문서 색인 로드 실패: {str(e)}")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "version": INDEX_VERSION,
+                "max_chunk_chars": self.max_chunk_chars,
+                "docs": {
+                    name: {
+                        "hash": doc["hash"],
+                        "chunks": [
+                            {"section": c.section, "text": c.text, "terms": c.terms, "length": c.length}
+                            for c in doc["chunks"]
+                        ],
+                    }
+                    for name, doc in self._docs.items()
+                },
+            }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _compute_stats(chunks: List[Chunk]) -> Tuple[Dict[str, int], float]:
+        df: Counter = Counter()
+        for chunk in chunks:
+            df.update(chunk.terms.keys())
+        avg_length = sum(c.length for c in chunks) / len(chunks) if chunks else 0.0
+        return dict(df), avg_length
+
+    def _index_document(self, name: str, content: str) -> List[Chunk]:
+        chunks = []
+        for section, text in chunk_document(content, self.max_chunk_chars):
+            tokens = tokenize(text)
+            chunks.append(Chunk(store=name, section=section, text=text,
+                                terms=dict(Counter(tokens)), length=len(tokens)))
+        return chunks
+
+    def sync(self, documents: Dict[str, Tuple[str, str]]) -> List[str]:
+        """
+        documents: 매장 이름 -> (내용 해시, 내용)
+        해시가 바뀐 문서만 다시 색인하고, 사라진 문서는 색인에서 제거합니다.
+        """
+        with self._lock:
+            known = {name: doc["hash"] for name, doc in self._docs.items()}
+        changed = [name for name, (content_hash, _) in documents.items() if known.get(name) != content_hash]
+        removed = [name for name in known if name not in documents]
+        if not changed and not removed:
+            return []
+
+        rebuilt = {name: self._index_document(name, documents[name][1]) for name in changed}
+        with self._lock:
+            for name in removed:
+                self._docs.pop(name, None)
+                self._stats.pop(name, None)
+            for name, chunks in rebuilt.items():
+                self._docs[name] = {"hash": documents[name][0], "chunks": chunks}
+                self._stats[name] = self._compute_stats(chunks)
+        logger.info(f"매장 문서 재색인됨: {changed + removed}")
+        self.save()
+        return changed + removed
+
+    def chunks(self, store: str) -> List[Chunk]:
+        with self._lock:
+            doc = self._docs.get(store)
+            return list(doc["chunks"]) if doc else []
+
+    def search(self, store: str, query: str, k: int = 4) -> List[Chunk]:
+        with self._lock:
+            doc = self._docs.get(store)
+            if not doc:
+                return []
+            chunks = doc["chunks"]
+            df, avg_length = self._stats[store]
+        n = len(chunks)
+        query_terms = set(tokenize(query))
+        scored = []
+        for position, chunk in enumerate(chunks):
+            score = 0.0
+            for term in query_terms:
+                tf = chunk.terms.get(term)
+                if not tf:
+                    continue
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * chunk.length / (avg_length or 1))
+                score += idf * tf * (BM25_K1 + 1) / norm
+            if score > 0:
+                scored.append((score, position, chunk))
+        # 점수가 높은 순서로 돌려줍니다.
+        return [chunk for _, _, chunk in sorted(scored, key=lambda item: (-item[0], item[1]))[:k]]
+
+
+class StoreRetriever:
+    """
+    매장 문서가 짧으면 전체를, 길면 고정 부분(첫 문단과 운영시간)과 질문 관련 청크만 프롬프트에 넣습니다.
+    """
+
+    def __init__(self, store_registry, index: StoreIndex, count_tokens: Callable[[str], int],
+                 top_k: int = 4, min_doc_tokens: int = 600):
+        self.store_registry = store_registry
+        self.index = index
+        self.count_tokens = count_tokens
+        self.top_k = top_k
+        self.min_doc_tokens = min_doc_tokens
+        self._doc_tokens: Dict[str, int] = {}
+
+    def _sync(self) -> None:
+        documents = {}
+        for name in self.store_registry.store_names():
+            document = self.store_registry.get(name)
+            if document is not None:
+                documents[name] = (document.content_hash, document.content)
+        self.index.sync(documents)
+
+    def context_for(self, store_name: str, query: str) -> Tuple[str, str]:
+        """
+        (고정 매장 정보, 질문 관련 매장 정보)를 반환합니다.
+        고정 부분은 system 프롬프트에, 관련 부분은 매 질문의 user 메시지에 넣습니다.
+        """
+        document = self.store_registry.get(store_name)
+        if document is None:
+            return "", ""
+        cache_key = document.content_hash
+        if cache_key not in self._doc_tokens:
+            self._doc_tokens[cache_key] = self.count_tokens(document.content)
+        if self._doc_tokens[cache_key] <= self.min_doc_tokens:
+            return document.content, ""
+
+        self._sync()
+        chunks = self.index.chunks(store_name)
+        if not chunks:
+            return document.content, ""
+        stable = [chunks[0]] + [c for c in chunks[1:] if c.section.startswith(PINNED_SECTIONS)]
+        stable_texts = {c.text for c in stable}
+        relevant = [
+            c for c in self.index.search(store_name, query, k=self.top_k + len(stable))
+            if c.text not in stable_texts
+        ][:self.top_k]
+        # 프롬프트에는 문서 원래 순서대로 넣습니다.
+        relevant.sort(key=chunks.index)
+        return "\n\n".join(c.text for c in stable), "\n\n".join(c.text for c in relevant)
+
+
+if __name__ == "__main__":
+    # 오프라인 색인 생성: python -m utils.retrieval
+    from utils.store_registry import StoreRegistry
+    store_registry = StoreRegistry()
+    index = StoreIndex(path=os.path.join(".cache", "store_index.json"))
+    documents = {
+        name: (store_registry.get(name).content_hash, store_registry.get(name).content)
+        for name in store_registry.store_names()
+    }
+    changed = index.sync(documents)
+    print(f"색인 완료: {len(documents)}개 문서, 재색인 {len(changed)}개")
@@ -0,0 +1,287 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from loguru import logger
+from utils.metrics import metrics
+
+# 열 타입 이름 -> 변환에 사용할 pandas dtype
+DTYPE_ALIASES = {
+    "int": "Int64",
+    "float": "Float64",
+    "bool": "boolean",
+    "string": "string",
+    "datetime": "datetime64[ns]",
+}
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def column_letter(index: int) -> str:
+    """0부터 시작하는 열 번호를 A, B, ..., Z, AA 형식으로 바꿉니다."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _cell_range(sheet: str, row: int, first_col: int, last_col: int) -> str:
+    # row는 시트의 행 번호(1부터), 열 번호는 0부터입니다.
+    return f"'{sheet}'!{column_letter(first_col)}{row}:{column_letter(last_col)}{row}"
+
+
+def _convert(text: pd.Series, dtype: str) -> Optional[pd.Series]:
+    """문자열 열을 dtype으로 바꿉니다. 비어 있지 않은 값 중 하나라도 바꿀 수 없으면 None을 반환합니다."""
+    blank = text.isna() | (text == "")
+    if dtype == "string":
+        return text
+    if dtype in ("Int64", "Float64"):
+        converted = pd.to_numeric(text.str.replace(",", "", regex=False).mask(blank), errors="coerce")
+        if converted[~blank].isna().any():
+            return None
+        if dtype == "Int64":
+            if (converted[~blank] % 1 != 0).any():
+                return None
+            return converted.astype("Int64")
+        return converted.astype("Float64")
+    if dtype == "boolean":
+        upper = text.str.upper()
+        if not upper[~blank].isin(["TRUE", "FALSE"]).all():
+            return None
+        return upper.mask(blank).map({"TRUE": True, "FALSE": False}).astype("boolean")
+    if dtype == "datetime64[ns]":
+        converted = pd.to_datetime(text.mask(blank), errors="coerce")
+        if converted[~blank].isna().any():
+            return None
+        return converted
+    raise ValueError(f"지원하지 않는 열 타입입니다: {dtype}")
+
+
+def infer_dtype(text: pd.Series) -> str:
+    """정수 → 실수 → 불리언 순서로 모든 값이 맞는 첫 타입을, 없으면 string을 반환합니다."""
+    for dtype in ("Int64", "Float64", "boolean"):
+        converted = _convert(text, dtype)
+        if converted is not None and converted.notna().any():
+            return dtype
+    return "string"
+
+
+def _cells(df: pd.DataFrame) -> pd.DataFrame:
+    """시트에 쓸 값으로 바꿉니다. 결측값은 빈 문자열, 날짜는 DATETIME_FORMAT 문자열이 됩니다."""
+    cells = df.copy()
+    for column in cells.select_dtypes(include=["datetime", "datetimetz"]).columns:
+        cells[column] = cells[column].dt.strftime(DATETIME_FORMAT)
+    cells = cells.astype(object)
+    return cells.where(cells.notna(), "")
+
+
+def _cell_hashes(cells: pd.DataFrame) -> np.ndarray:
+    """셀마다 64비트 해시를 계산합니다 (행 수 x 열 수). 스냅샷은 원본 값 대신 이 해시만 보관합니다."""
+    if cells.empty:
+        return np.empty((len(cells), len(cells.columns)), dtype=np.uint64)
+    return np.column_stack([
+        pd.util.hash_array(cells[column].astype(str).to_numpy(dtype=object)) for column in cells.columns
+    ])
+
+
+@dataclass
+class _Snapshot:
+    columns: Tuple[str, ...]
+    hashes: np.ndarray
+
+
+class SheetFrameBridge:
+    """
+    큰 시트를 DataFrame으로 나눠 읽고 쓰는 도구입니다.
+    - 읽기: 헤더(1행) 아래를 chunk_rows행씩 batchGet으로 읽고, 청크마다 열 타입을 한 번에 변환합니다.
+      dtypes를 주지 않으면 첫 청크로 추론한 타입을 이후 청크에 적용하며, 맞지 않는 값이 나오면 그 열은 문자열로 읽습니다.
+      읽기에 실패하면 마지막 정상 값으로 대신하지 않고 오류를 그대로 발생시키며, 스냅샷도 남기지 않습니다.
+    - 쓰기: 요청당 셀 수가 max_cells_per_request를 넘지 않도록 나눠 values.batchUpdate로 씁니다.
+      마지막으로 읽거나 쓴 스냅샷(셀 해시)이 있으면 바뀐 셀, 늘어난 행, 줄어든 행만 씁니다.
+      스냅샷이 없으면 시트 값을 모두 지운 뒤 전체를 씁니다.
+    """
+
+    def __init__(self, sheet_manager, chunk_rows: int = 2000, ranges_per_request: int = 5,
+                 max_cells_per_request: int = 50000):
+        self.sheet_manager = sheet_manager
+        self.chunk_rows = chunk_rows
+        self.ranges_per_request = ranges_per_request
+        self.max_cells_per_request = max_cells_per_request
+        self._snapshots: Dict[Tuple[str, str], _Snapshot] = {}
+        self.api_calls = 0
+        self.cells_written = 0
+
+    def _read_ranges(self, spreadsheet_id: str, ranges: List[str]) -> Dict[str, List[List]]:
+        # 실패를 빈 범위(시트 끝)로 착각하지 않도록 마지막 정상 값 대신 오류를 받습니다.
+        self.api_calls += 1
+        return self.sheet_manager.read_ranges(spreadsheet_id, ranges, strict=True)
+
+    def _read_header(self, spreadsheet_id: str, sheet: str) -> List[str]:
+        header_range = f"'{sheet}'!1:1"
+        rows = self._read_ranges(spreadsheet_id, [header_range]).get(header_range, [])
+        return [str(name) for name in rows[0]] if rows else []
+
+    def iter_frames(self, spreadsheet_id: str, sheet: str,
+                    dtypes: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        헤더 아래 데이터를 chunk_rows행씩 타입이 지정된 DataFrame으로 돌려줍니다.
+        끝까지 읽었을 때만 스냅샷을 갱신합니다. 읽기에 실패하면 이전 스냅샷도 버려 다음 write_frame이 전체를 씁니다.
+        """
+        try:
+            header = self._read_header(spreadsheet_id, sheet)
+        except Exception:
+            self.forget(spreadsheet_id, sheet)
+            raise
+        if not header:
+            return
+        last_col = column_letter(len(header) - 1)
+        resolved = {column: DTYPE_ALIASES.get(dtype, dtype) for column, dtype in (dtypes or {}).items()}
+        hashes: List[np.ndarray] = []
+        start = 2
+        done = False
+        while not done:
+            ranges = [
+                f"'{sheet}'!A{start + i * self.chunk_rows}:{last_col}{start + (i + 1) * self.chunk_rows - 1}"
+                for i in range(self.ranges_per_request)
+            ]
+            try:
+                batched = self._read_ranges(spreadsheet_id, ranges)
+            except Exception:
+                self.forget(spreadsheet_id, sheet)
+                raise
+            for range_name in ranges:
+                rows = batched.get(range_name, [])
+                if len(rows) < self.chunk_rows:
+                    done = True
+                if rows:
+                    chunk = pd.DataFrame(rows, columns=header, dtype="string")
+                    chunk.index = pd.RangeIndex(start - 2, start - 2 + len(chunk))
+                    chunk = self._apply_dtypes(chunk, resolved)
+                    hashes.append(_cell_hashes(_cells(chunk)))
+                    yield chunk
+                start += self.chunk_rows
+                if done:
+                    break
+        self._snapshots[(spreadsheet_id, sheet)] = _Snapshot(
+            tuple(header),
+            np.vstack(hashes) if hashes else np.empty((0, len(header)), dtype=np.uint64)
+        )
+
+    def read_frame(self, spreadsheet_id: str, sheet: str,
+                   dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """시트 전체를 하나의 DataFrame으로 읽습니다. 이후 write_frame은 이 내용과 비교해 바뀐 셀만 씁니다."""
+        chunks = list(self.iter_frames(spreadsheet_id, sheet, dtypes))
+        if not chunks:
+            header = self._snapshots.get((spreadsheet_id, sheet))
+            return pd.DataFrame(columns=list(header.columns) if header else [])
+        return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+    @staticmethod
+    def _apply_dtypes(chunk: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+        """dtypes에 없는 열은 이 청크로 추론해 dtypes에 채워 넣고, 이후 청크에도 같은 타입을 적용합니다."""
+        typed = {}
+        for column in chunk.columns:
+            dtype = dtypes.setdefault(column, infer_dtype(chunk[column]))
+            converted = _convert(chunk[column], dtype)
+            if converted is None:
+                logger.warning(f"'{column}' 열에 {dtype} 타입이 아닌 값이 있어 문자열로 읽습니다.")
+                dtypes[column] = "string"
+                converted = chunk[column]
+            typed[column] = converted
+        return pd.DataFrame(typed, index=chunk.index)
+
+    def _flush_writes(self, spreadsheet_id: str, data: Dict[str, List[List]]) -> bool:
+        """셀 수가 max_cells_per_request를 넘지 않게 나눠 씁니다."""
+        ok = True
+        batch: Dict[str, List[List]] = {}
+        cells = 0
+        for range_name, values in data.items():
+            size = sum(len(row) for row in values)
+            if batch and cells + size > self.max_cells_per_request:
+                ok = self._write_batch(spreadsheet_id, batch, cells) and ok
+                batch, cells = {}, 0
+            batch[range_name] = values
+            cells += size
+        if batch:
+            ok = self._write_batch(spreadsheet_id, batch, cells) and ok
+        return ok
+
+    def _write_batch(self, spreadsheet_id: str, batch: Dict[str, List[List]], cells: int) -> bool:
+        self.api_calls += 1
+        if not self.sheet_manager.write_ranges(spreadsheet_id, batch):
+            return False
+        self.cells_written += cells
+        metrics.inc("sheet_frames_cells_written_total", cells)
+        return True
+
+    def _row_ranges(self, sheet: str, cells: pd.DataFrame, first_row: int, width: int) -> Dict[str, List[List]]:
+        """cells를 chunk_rows행씩 나눈 범위별 값입니다. first_row는 cells 첫 행의 시트 행 번호입니다."""
+        last_col = column_letter(width - 1)
+        data = {}
+        for offset in range(0, len(cells), self.chunk_rows):
+            block = cells.iloc[offset:offset + self.chunk_rows]
+            row = first_row + offset
+            data[f"'{sheet}'!A{row}:{last_col}{row + len(block) - 1}"] = block.values.tolist()
+        return data
+
+    def write_frame(self, spreadsheet_id: str, sheet: str, df: pd.DataFrame, diff: bool = True) -> bool:
+        """
+        DataFrame을 시트의 A1부터(헤더 포함) 씁니다.
+        diff가 True이고 같은 열 구성의 스냅샷이 있으면 바뀐 셀만 쓰고, 줄어든 행은 빈 값으로 지웁니다.
+        그 외에는 시트 값을 먼저 지워 이전 내용(더 많던 행/열)이 남지 않게 한 뒤 전체를 씁니다.
+        """
+        cells = _cells(df.reset_index(drop=True))
+        hashes = _cell_hashes(cells)
+        columns = tuple(str(column) for column in df.columns)
+        snapshot = self._snapshots.get((spreadsheet_id, sheet)) if diff else None
+        width = len(columns)
+
+        data: Dict[str, List[List]] = {}
+        if snapshot is None or snapshot.columns != columns:
+            self.api_calls += 1
+            if not self.sheet_manager.clear_sheet_range(spreadsheet_id, f"'{sheet}'"):
+                self._snapshots.pop((spreadsheet_id, sheet), None)
+                return False
+            data[_cell_range(sheet, 1, 0, width - 1)] = [list(columns)]
+            data.update(self._row_ranges(sheet, cells, 2, width))
+        else:
+            common = min(len(cells), len(snapshot.hashes))
+            rows, cols = np.nonzero(hashes[:common] != snapshot.hashes[:common])
+            # 같은 행에서 이어진 열은 한 범위로 묶습니다.
+            breaks = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 1)) + 1
+            for run_rows, run_cols in zip(np.split(rows, breaks), np.split(cols, breaks)):
+                if not len(run_rows):
+                    continue
+                row, first_col, last_col = int(run_rows[0]), int(run_cols[0]), int(run_cols[-1])
+                data[_cell_range(sheet, row + 2, first_col, last_col)] = [
+                    cells.iloc[row, first_col:last_col + 1].tolist()
+                ]
+            if len(cells) > common:
+                data.update(self._row_ranges(sheet, cells.iloc[common:], common + 2, width))
+            elif len(snapshot.hashes) > common:
+                removed = len(snapshot.hashes) - common
+                blank = pd.DataFrame([[""] * width] * removed)
+                data.update(self._row_ranges(sheet, blank, common + 2, width))
+
+        if not data:
+            return True
+        ok = self._flush_writes(spreadsheet_id, data)
+        if ok:
+            self._snapshots[(spreadsheet_id, sheet)] = _Snapshot(columns, hashes)
+        else:
+            # 일부만 쓰였을 수 있으므로 다음 쓰기는 전체를 씁니다.
+            self._snapshots.pop((spreadsheet_id, sheet), None)
+        return ok
+
+    def forget(self, spreadsheet_id: str, sheet: Optional[str] = None) -> None:
+        """스냅샷을 지워 다음 write_frame이 전체를 쓰게 합니다."""
+        for key in [k for k in self._snapshots if k[0] == spreadsheet_id and (sheet is None or k[1] == sheet)]:
+            del self._snapshots[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "api_calls": self.api_calls,
+            "cells_written": self.cells_written,
+            "snapshots": len(self._snapshots),
+        }
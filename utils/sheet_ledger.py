@@ -0,0 +1,204 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+from loguru import logger
+from utils.metrics import metrics
+
+
+@dataclass
+class LedgerRow:
+    key: str
+    spreadsheet_id: str
+    range_name: str
+    values: List
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class SheetLedger:
+    """
+    주문/대기 변경 기록처럼 자주 쌓이는 행을 모아 Google Sheets에 한 번에 추가합니다.
+    - 행은 (spreadsheet_id, range)별로 모았다가 batch_size 또는 flush_interval마다 values.append 한 번으로 씁니다.
+    - 모든 행은 멱등 키를 가지며 시트의 첫 열에 함께 기록됩니다. 버퍼에 있거나 최근에 쓴 키는 다시 받지 않습니다.
+    - 버퍼는 로컬 journal 파일에 먼저 기록해 프로세스가 죽어도 다시 시작하면 이어서 씁니다.
+      (쓰기 직후 journal 정리 전에 죽으면 같은 키의 행이 중복될 수 있으며, 키 열로 걸러낼 수 있습니다.)
+    - 쓰기에 실패한 행은 버퍼에 남겨 다음 flush에서 다시 씁니다.
+    """
+
+    def __init__(self, sheet_manager, batch_size: int = 100, flush_interval: float = 2.0,
+                 journal_path: Optional[str] = ".cache/sheet_ledger.jsonl", stats_window: int = 200,
+                 max_flushed_keys: int = 10000):
+        self.sheet_manager = sheet_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+
+        self._rows: "OrderedDict[str, LedgerRow]" = OrderedDict()
+        # 최근에 쓴 키 (같은 키로 다시 들어온 행을 버립니다)
+        self._flushed_keys: "OrderedDict[str, None]" = OrderedDict()
+        self.max_flushed_keys = max_flushed_keys
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._closed = False
+
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+        self.failed_batches = 0
+        self.duplicates = 0
+        self._batch_sizes: Deque[int] = deque(maxlen=stats_window)
+        self._flush_ms: Deque[float] = deque(maxlen=stats_window)
+
+        self._load_journal()
+        self._thread = threading.Thread(target=self._run, name="sheet-ledger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, spreadsheet_id: str, range_name: str, values: List, key: Optional[str] = None) -> str:
+        """행을 버퍼에 넣고 멱등 키를 반환합니다. 버퍼에 있거나 최근에 쓴 키면 무시합니다."""
+        row = LedgerRow(key or uuid.uuid4().hex, spreadsheet_id, range_name, list(values))
+        with self._cond:
+            if row.key in self._rows or row.key in self._flushed_keys:
+                self.duplicates += 1
+                return row.key
+            self._write_journal([row])
+            self._rows[row.key] = row
+            if len(self._rows) >= self.batch_size:
+                self._cond.notify()
+        return row.key
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._rows)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._rows) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self) -> None:
+        """버퍼의 행을 (spreadsheet_id, range)별로 한 번씩 추가하고, 성공한 행만 버퍼와 journal에서 지웁니다."""
+        with self._flush_lock:
+            with self._cond:
+                groups: Dict[Tuple[str, str], List[LedgerRow]] = {}
+                for row in self._rows.values():
+                    groups.setdefault((row.spreadsheet_id, row.range_name), []).append(row)
+            if not groups:
+                return
+
+            written: List[str] = []
+            for (spreadsheet_id, range_name), rows in groups.items():
+                started = time.perf_counter()
+                ok = self.sheet_manager.append_sheet_data(
+                    spreadsheet_id, range_name, [[row.key] + row.values for row in rows]
+                )
+                elapsed = time.perf_counter() - started
+                metrics.observe("sheet_ledger_flush_seconds", elapsed)
+                if not ok:
+                    self.failed_batches += 1
+                    metrics.inc("sheet_ledger_failed_batches_total")
+                    logger.warning(f"시트 기록 {len(rows)}건 쓰기 실패, 다음 flush에서 다시 시도: {range_name}")
+                    continue
+                written.extend(row.key for row in rows)
+                self.flushed_batches += 1
+                self.flushed_rows += len(rows)
+                self._batch_sizes.append(len(rows))
+                self._flush_ms.append(elapsed * 1000)
+                metrics.inc("sheet_ledger_rows_total", len(rows))
+                logger.debug(f"시트 기록 {len(rows)}건 추가됨 ({range_name}, {elapsed * 1000:.0f}ms)")
+
+            if written:
+                with self._cond:
+                    for key in written:
+                        self._rows.pop(key, None)
+                        self._flushed_keys[key] = None
+                    while len(self._flushed_keys) > self.max_flushed_keys:
+                        self._flushed_keys.popitem(last=False)
+                    self._rewrite_journal(list(self._rows.values()))
+
+    def _write_journal(self, rows: List[LedgerRow]) -> None:
+        if not self.journal_path:
+            return
+        with self._journal_lock:
+            directory = os.path.dirname(self.journal_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.journal_path, 'a', encoding='utf-8') as file:
+                for row in rows:
+                    file.write(json.dumps(asdict(row), ensure_ascii=False) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+    def _rewrite_journal(self, rows: List[LedgerRow]) -> None:
+        if not self.journal_path:
+            return
+        with self._journal_lock:
+            if not rows:
+                if os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+                return
+            tmp_path = f"{self.journal_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                for row in rows:
+                    file.write(json.dumps(asdict(row), ensure_ascii=False) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.journal_path)
+
+    def _load_journal(self) -> None:
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    row = LedgerRow(**json.loads(line))
+                except (ValueError, TypeError) as e:
+                    # 기록 도중 죽어 잘린 마지막 줄은 건너뜁니다.
+                    logger.warning(f"시트 기록 journal의 손상된 줄을 건너뜁니다: {str(e)}")
+                    continue
+                self._rows.setdefault(row.key, row)
+        if self._rows:
+            logger.info(f"시트 기록 journal에서 {len(self._rows)}건을 불러왔습니다.")
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            batch_sizes = list(self._batch_sizes)
+            flush_ms = list(self._flush_ms)
+            pending = len(self._rows)
+        return {
+            "pending": pending,
+            "flushed_batches": self.flushed_batches,
+            "flushed_rows": self.flushed_rows,
+            "failed_batches": self.failed_batches,
+            "duplicates": self.duplicates,
+            "batch_size_p50": _percentile(batch_sizes, 0.5) or 0,
+            "batch_size_max": max(batch_sizes, default=0),
+            "flush_ms_p50": round(_percentile(flush_ms, 0.5) or 0, 1),
+            "flush_ms_p95": round(_percentile(flush_ms, 0.95) or 0, 1),
+        }
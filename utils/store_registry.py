@@ -0,0 +1,126 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from loguru import logger
+from utils.resources import registry
+
+COMMON_INSTRUCTIONS_NAME = "공통지시사항"
+
+
+@dataclass(frozen=True)
+class StoreDocument:
+    name: str
+    path: str
+    content: str
+    content_hash: str
+    mtime: float
+
+
+class StoreRegistry:
+    """
+    store_infos 디렉터리의 매장 문서를 시작 시 한 번 읽어 메모리에 보관합니다.
+    파일 수정 시각을 주기적으로 확인해 바뀐 문서만 다시 읽습니다.
+    """
+
+    def __init__(self, directory: str = "store_infos", reload_interval: float = 5.0):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._documents: Dict[str, StoreDocument] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reload()
+
+    @staticmethod
+    def _read(name: str, path: str) -> StoreDocument:
+        mtime = os.path.getmtime(path)
+        with open(path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        return StoreDocument(
+            name=name,
+            path=path,
+            content=content,
+            content_hash=hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            mtime=mtime,
+        )
+
+    def reload(self) -> List[str]:
+        """
+        디렉터리를 다시 훑어 추가/변경/삭제된 문서를 반영하고, 바뀐 문서 이름을 반환합니다.
+        """
+        changed = []
+        try:
+            filenames = [f for f in os.listdir(self.directory) if f.endswith(".md")]
+        except OSError as e:
+            logger.error(f"매장 문서 디렉터리 조회 실패: {str(e)}")
+            return changed
+
+        with self._lock:
+            current = dict(self._documents)
+        seen = set()
+        for filename in filenames:
+            name = filename[:-3]
+            path = os.path.join(self.directory, filename)
+            seen.add(name)
+            try:
+                existing = current.get(name)
+                if existing and existing.mtime == os.path.getmtime(path):
+                    continue
+                document = self._read(name, path)
+                if existing and existing.content_hash == document.content_hash:
+                    current[name] = document
+                    continue
+                current[name] = document
+                changed.append(name)
+            except OSError as e:
+                logger.error(f"매장 문서 로드 실패: {path} ({str(e)})")
+        for name in set(current) - seen:
+            del current[name]
+            changed.append(name)
+
+        with self._lock:
+            self._documents = current
+        if changed:
+            logger.info(f"매장 문서 로드됨: {changed}")
+        return changed
+
+    def start_watching(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name="store-registry-watcher", daemon=True)
+        self._thread.start()
+
+    def stop_watching(self) -> None:
+        self._stop_event.set()
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.reload_interval):
+            self.reload()
+
+    def get(self, name: str) -> Optional[StoreDocument]:
+        with self._lock:
+            return self._documents.get(name)
+
+    def store_names(self) -> List[str]:
+        with self._lock:
+            return sorted(n for n in self._documents if n != COMMON_INSTRUCTIONS_NAME)
+
+    def content_hashes(self) -> Dict[str, str]:
+        with self._lock:
+            return {name: doc.content_hash for name, doc in self._documents.items()}
+
+
+def _create_store_registry() -> StoreRegistry:
+    store_registry = StoreRegistry()
+    if store_registry.get(COMMON_INSTRUCTIONS_NAME) is None:
+        logger.error(f"공통 지시사항 문서가 없습니다: {COMMON_INSTRUCTIONS_NAME}.md")
+    store_registry.start_watching()
+    return store_registry
+
+
+def get_store_registry() -> StoreRegistry:
+    """프로세스 전체에서 공유하는 매장 문서 레지스트리를 반환합니다."""
+    return registry.get_or_create(('store_registry',), _create_store_registry)
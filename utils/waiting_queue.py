@@ -0,0 +1,142 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class WaitingSnapshot:
+    rows: List[List[str]]
+    fetched_at: float
+    version: int
+
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class WaitingQueueCache:
+    """
+    대기 인원 스냅샷을 프로세스 전체에서 공유하는 캐시입니다.
+    백그라운드 스레드가 주기적으로 갱신하고, 조회는 항상 마지막 스냅샷을 즉시 반환합니다.
+    """
+
+    def __init__(self, fetcher: Callable[[], Optional[List[List]]], refresh_interval: float = 10.0):
+        self.fetcher = fetcher
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[WaitingSnapshot] = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # get()이 띄운 재갱신 스레드가 이미 있거나 최근에 시도했으면 새로 띄우지 않습니다.
+        self._revalidating = False
+        self._last_revalidate_at = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="waiting-queue-refresher", daemon=True)
+        self._thread.start()
+        logger.info(f"대기 현황 갱신 스레드 시작됨 (주기: {self.refresh_interval}초)")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        self.refresh()
+        while not self._stop_event.wait(self.refresh_interval):
+            self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        대기 현황을 다시 읽어옵니다. 이미 다른 스레드가 갱신 중이면 건너뜁니다.
+        실패하면 마지막 스냅샷을 그대로 유지합니다.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            rows = self.fetcher()
+            if rows is None:
+                return False
+            with self._lock:
+                if self._snapshot is None or self._snapshot.rows != rows:
+                    self._version += 1
+                self._snapshot = WaitingSnapshot(rows=rows, fetched_at=time.time(), version=self._version)
+            self.last_error = None
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"대기 현황 갱신 실패: {str(e)}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def get(self) -> Optional[WaitingSnapshot]:
+        """
+        마지막 스냅샷을 반환합니다 (stale-while-revalidate).
+        스냅샷이 갱신 주기의 두 배 이상 오래되었으면 백그라운드에서 한 번 더 갱신을 시도합니다.
+        (동시에 하나만, 갱신 주기마다 최대 한 번)
+        """
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            # 최초 조회는 동기로 채워 둡니다.
+            self.refresh()
+            with self._lock:
+                return self._snapshot
+        if snapshot.age_seconds() > self.refresh_interval * 2:
+            self._revalidate()
+        return snapshot
+
+    def _revalidate(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._revalidating or now - self._last_revalidate_at < self.refresh_interval:
+                return
+            self._revalidating = True
+            self._last_revalidate_at = now
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._revalidating = False
+        threading.Thread(target=run, name="waiting-queue-revalidate", daemon=True).start()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            snapshot = self._snapshot
+        return {
+            "version": self._version,
+            "age_seconds": round(snapshot.age_seconds(), 1) if snapshot else -1,
+            "failing": int(self.last_error is not None),
+        }
+
+
+def make_sheet_fetcher(sheet_manager, spreadsheet_id: str) -> Callable[[], Optional[List[List]]]:
+    """
+    첫 번째 시트의 A:B 열을 읽는 fetcher를 만듭니다.
+    읽기에 실패하면 마지막 정상 값 대신 오류를 발생시켜, 스냅샷이 실제 조회 시각을 유지하고 last_error가 남게 합니다.
+    """
+    def fetch() -> Optional[List[List]]:
+        metadata = sheet_manager.get_spreadsheet_metadata(spreadsheet_id)
+        if not metadata or not metadata.get('sheets'):
+            raise RuntimeError("대기 현황 시트 정보를 가져오지 못했습니다")
+        sheet_title = metadata['sheets'][0]['properties']['title']
+        return sheet_manager.read_sheet_data(spreadsheet_id, f"{sheet_title}!A:B", strict=True)
+    return fetch
+
+
+def format_waiting_info(snapshot: Optional[WaitingSnapshot]) -> str:
+    if snapshot is None or not snapshot.rows:
+        return "\n현재 대기 인원 정보를 확인할 수 없습니다."
+    waiting_info = f"\n현재 대기 현황 ({int(snapshot.age_seconds())}초 전 기준):\n"
+    for row in snapshot.rows:
+        if len(row) >= 2:  # A열과 B열 모두 데이터가 있는 경우
+            waiting_info += f"- {row[0]}: {row[1]}명\n"
+    return waiting_info
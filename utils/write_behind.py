@@ -0,0 +1,257 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+from utils.chat_backends import is_permanent_error
+from utils.metrics import metrics
+
+# 저장 순서 (메시지가 참조하는 blob과 세션을 먼저 저장)
+WRITE_STEPS = ("blobs", "sessions", "messages", "timestamps")
+
+
+class WriteBehindQueue:
+    """
+    채팅 세션/메시지 쓰기를 요청 경로에서 분리해 백그라운드에서 묶어서 저장합니다.
+    - 프롬프트 blob, 세션 생성, 메시지는 batch_size 또는 flush_interval마다 한 번에 insert 합니다.
+    - 세션 타임스탬프 갱신은 세션별로 마지막 값만 남깁니다.
+    - 테이블 단위로 지수 백오프 재시도하고, 그래도 실패하면 남은 단계만 로컬 journal 파일에 남겨
+      저장소가 복구된 뒤 다시 씁니다. 메시지는 client_id로 upsert하므로 다시 써도 중복되지 않습니다.
+    - 제약 조건 위반처럼 다시 보내도 실패할 기록은 dead-letter 파일로 보내 이후 쓰기를 막지 않습니다.
+    - 프로세스 종료 시 남은 쓰기를 모두 flush 합니다.
+    """
+
+    def __init__(self, backend, batch_size: int = 50, flush_interval: float = 1.0,
+                 max_retries: int = 3, backoff: float = 0.5,
+                 journal_path: Optional[str] = ".cache/chat_journal.jsonl",
+                 journal_retry_interval: float = 30.0,
+                 dead_letter_path: Optional[str] = ".cache/chat_dead_letter.jsonl"):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.journal_path = journal_path
+        self.journal_retry_interval = journal_retry_interval
+        self.dead_letter_path = dead_letter_path
+        self._next_replay_at = 0.0
+
+        self._blobs: List[Dict] = []
+        self._sessions: List[Dict] = []
+        self._messages: List[Dict] = []
+        self._timestamps: Dict[str, str] = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._closed = False
+
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+        self.retries = 0
+        self.spilled_batches = 0
+        self.dead_lettered_batches = 0
+        self._blob_listeners: List[Callable[[List[str], bool], None]] = []
+
+        self._thread = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue_blob(self, row: Dict) -> None:
+        self._enqueue(lambda: self._blobs.append(row))
+
+    def add_blob_listener(self, listener: Callable[[List[str], bool], None]) -> None:
+        """
+        blob이 저장되면 listener(hashes, True)를, 버려지면(dead-letter, journal 없이 실패) listener(hashes, False)를 호출합니다.
+        journal에 보관된 blob은 재저장될 때 알립니다.
+        """
+        self._blob_listeners.append(listener)
+
+    def _notify_blobs(self, rows: List[Dict], written: bool) -> None:
+        hashes = [row['hash'] for row in rows]
+        for listener in self._blob_listeners:
+            try:
+                listener(hashes, written)
+            except Exception as e:
+                logger.error(f"blob 저장 알림 처리 실패: {str(e)}")
+
+    def enqueue_session(self, row: Dict) -> None:
+        self._enqueue(lambda: self._sessions.append(row))
+
+    def enqueue_message(self, row: Dict) -> None:
+        self._enqueue(lambda: self._messages.append(row))
+
+    def touch_session(self, session_id: str, updated_at: str) -> None:
+        self._enqueue(lambda: self._timestamps.__setitem__(session_id, updated_at))
+
+    def _enqueue(self, action) -> None:
+        with self._cond:
+            action()
+            if self._pending_locked() >= self.batch_size:
+                self._cond.notify()
+
+    def _pending_locked(self) -> int:
+        return len(self._blobs) + len(self._sessions) + len(self._messages) + len(self._timestamps)
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending_locked()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and self._pending_locked() < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        대기 중인 쓰기를 한 번에 저장합니다.
+        journal에 남은 기록이 있으면 순서를 지키기 위해 먼저 다시 쓰고, 실패하면 새 기록도 journal에 덧붙입니다.
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch = {
+                    "blobs": self._blobs,
+                    "sessions": self._sessions,
+                    "messages": self._messages,
+                    "timestamps": self._timestamps,
+                }
+                self._blobs, self._sessions, self._messages, self._timestamps = [], [], [], {}
+            has_rows = any(batch.values())
+            if not self._replay_journal():
+                if has_rows:
+                    self._spill(batch)
+                return
+            if has_rows and not self._write_with_retry(batch):
+                self._spill(batch)
+
+    def _write_step(self, step: str, rows) -> None:
+        if step == "blobs":
+            self.backend.insert_blobs(rows)
+        elif step == "sessions":
+            self.backend.insert_sessions(rows)
+        elif step == "messages":
+            self.backend.insert_messages(rows)
+        else:
+            self.backend.update_session_timestamps(rows)
+
+    @metrics.timed("chat_store.write_batch")
+    def _write(self, batch: Dict, max_retries: int) -> bool:
+        """
+        테이블 단위로 순서대로 씁니다. 메시지가 참조하는 blob과 세션을 먼저 저장합니다.
+        성공했거나 dead-letter로 보낸 단계는 batch에서 비우므로, 실패 후 다시 쓸 때 이미 저장된 단계는 반복하지 않습니다.
+        일시적인 오류로 재시도를 모두 소진하면 False를 반환합니다.
+        """
+        for step in WRITE_STEPS:
+            rows = batch.get(step)
+            if not rows:
+                continue
+            for attempt in range(max_retries + 1):
+                try:
+                    self._write_step(step, rows)
+                    if step == "blobs":
+                        self._notify_blobs(rows, True)
+                    break
+                except Exception as e:
+                    if is_permanent_error(e):
+                        self._dead_letter(step, rows, e)
+                        if step == "blobs":
+                            self._notify_blobs(rows, False)
+                        break
+                    if attempt == max_retries:
+                        logger.error(f"채팅 기록 저장 실패 ({step}, 재시도 {max_retries}회 초과): {str(e)}")
+                        return False
+                    self.retries += 1
+                    delay = self.backoff * (2 ** attempt)
+                    logger.warning(f"채팅 기록 저장 실패 ({step}), {delay:.1f}초 후 재시도: {str(e)}")
+                    time.sleep(delay)
+            batch[step] = {} if step == "timestamps" else []
+        return True
+
+    def _write_with_retry(self, batch: Dict) -> bool:
+        rows = sum(len(items) for items in batch.values())
+        started = time.monotonic()
+        if not self._write(batch, self.max_retries):
+            return False
+        self.flushed_batches += 1
+        self.flushed_rows += rows
+        logger.debug(f"채팅 기록 {rows}건 저장됨 ({(time.monotonic() - started) * 1000:.0f}ms)")
+        return True
+
+    def _dead_letter(self, step: str, rows, error: Exception) -> None:
+        """다시 보내도 실패할 기록은 journal 대신 dead-letter 파일에 남겨 이후 쓰기를 막지 않게 합니다."""
+        self.dead_lettered_batches += 1
+        metrics.inc("chat_store_dead_letter_total", step=step)
+        logger.error(f"채팅 기록을 dead-letter로 보냄 ({step}): {str(error)}")
+        if not self.dead_letter_path:
+            return
+        with self._journal_lock:
+            directory = os.path.dirname(self.dead_letter_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps({
+                    "step": step, "rows": rows, "error": str(error), "at": time.time()
+                }, ensure_ascii=False, default=str) + "\n")
+
+    def _spill(self, batch: Dict) -> None:
+        if not self.journal_path:
+            logger.error("journal 경로가 없어 채팅 기록을 버립니다.")
+            if batch.get("blobs"):
+                self._notify_blobs(batch["blobs"], False)
+            return
+        with self._journal_lock:
+            directory = os.path.dirname(self.journal_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.journal_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(batch, ensure_ascii=False) + "\n")
+        self.spilled_batches += 1
+        logger.warning(f"채팅 기록을 journal에 보관함: {self.journal_path}")
+
+    def _replay_journal(self) -> bool:
+        """journal이 비어 있거나 모두 다시 저장했으면 True를 반환합니다."""
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return True
+        if time.monotonic() < self._next_replay_at:
+            return False
+        with self._journal_lock:
+            with open(self.journal_path, 'r', encoding='utf-8') as file:
+                batches = [json.loads(line) for line in file if line.strip()]
+        for i, batch in enumerate(batches):
+            # 영구 오류는 _write 안에서 dead-letter로 빠지므로 일시적인 오류만 재생을 멈춥니다.
+            if not self._write(batch, max_retries=0):
+                logger.warning(f"journal 재저장 실패, {self.journal_retry_interval:.0f}초 후 다시 시도")
+                self._next_replay_at = time.monotonic() + self.journal_retry_interval
+                with self._journal_lock:
+                    with open(self.journal_path, 'w', encoding='utf-8') as file:
+                        for remaining in batches[i:]:
+                            file.write(json.dumps(remaining, ensure_ascii=False) + "\n")
+                return False
+        with self._journal_lock:
+            os.remove(self.journal_path)
+        logger.info(f"journal의 채팅 기록 {len(batches)}묶음 재저장 완료")
+        return True
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending(),
+            "flushed_batches": self.flushed_batches,
+            "flushed_rows": self.flushed_rows,
+            "retries": self.retries,
+            "spilled_batches": self.spilled_batches,
+            "dead_lettered_batches": self.dead_lettered_batches,
+        }